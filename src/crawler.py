@@ -1,294 +1,264 @@
-from dataclasses import dataclass
-from difflib import SequenceMatcher
+from asyncio import Runner, Semaphore, gather
 from typing import Final
 
-from bs4 import BeautifulSoup, ResultSet
-from bs4.element import Tag
-from requests import Response, Session
-
-
-@dataclass
-class UserIdentity:
-    id: str
-    display_name: str
-    username: str
-
-
-@dataclass
-class CarStats:
-    races: int
-    dqs: int
-    avg_wpm: float
-    avg_acc: float
-    top_wpm: float
-    top_acc: float
-    perf_acc: int
-
-
-@dataclass
-class Car:
-    name: str
-    image_url: str
-
-
-@dataclass
-class Quest:
-    name: str
-
-
-@dataclass
-class UserQuestProgress:
-    quest: Quest
-    progress: int
-
-
-@dataclass
-class UserQuests:
-    user_id: str
-    display_name: str
-    quest_progress: list[UserQuestProgress]
-
-
-@dataclass
-class UserStatOverview:
-    lifetime_races: int
-    longest_session: int
-    top_wpm: float
-    current_wpm: float
-    perfect_races: int
-    current_acc: float
-
-
-@dataclass
-class UserStats:
-    user_id: str
-    display_name: str
-    overview: UserStatOverview
-    # Add more stats here!
-
-
-@dataclass
-class Garage:
-    user_id: str
-    display_name: str
-    cars: list[Car]
-    selected_car: Car
-    selected_stats: CarStats
-
-
-@dataclass
-class Team:
-    name: str
-    tag: str
-    leader: UserIdentity
-    agents: list[UserIdentity]
-    members: list[UserIdentity]
-
-
-@dataclass
-class ShopOffer:
-    name: str
-    price: int
-    image_url: str
-
-
-@dataclass
-class Shop:
-    seasonal_offers: list[ShopOffer]
-    alices_deals: list[ShopOffer]
-
-
-class Crawler:
-    KlaviaUrl: Final[str] = "https://klavia.io"
-    SignInUrl: Final[str] = KlaviaUrl + "/racers/sign_in"
-    RacerUrl: Final[str] = KlaviaUrl + "/racers/{user_id}"
-    GarageUrl: Final[str] = RacerUrl + "/garage"
-    StatsUrl: Final[str] = RacerUrl + "/stats"
-    QuestsUrl: Final[str] = RacerUrl + "/quests"
-    LeaderboardsUrl: Final[str] = KlaviaUrl + "/leaderboards"
-    TextsUrl: Final[str] = LeaderboardsUrl + "/texts"
-    CarsUrl: Final[str] = LeaderboardsUrl + "/cars"
-    SearchRacerUrl: Final[str] = RacerUrl.format(user_id="autocomplete_with_garage") + "?query={search}"
-    TeamsUrl: Final[str] = KlaviaUrl + "/teams/{team_tag}"
-    ShopsUrl: Final[str] = KlaviaUrl + "/shops"
-    ShopSeasonUrl: Final[str] = ShopsUrl + "/season-shop"
-    ShopDealsUrl: Final[str] = ShopsUrl + "/alices-deals"
-    ShopItemsUrl: Final[str] = KlaviaUrl + "/shop_items/{item_id}"
-
-    def __init__(self, username: str, password: str) -> None:
-        self._session: Session = Crawler._login(username, password)
-
-    def get_skins(self) -> None:
-        response: Response = self._session.get("https://klavia.io/garage/cars/1495/view-car-skins")
-        soup: BeautifulSoup = BeautifulSoup(response.text, "html.parser")
+from klavia.car_catalogue import CarCatalogue
+from klavia.change_detection import ChangeDetector
+from klavia.identities import IdentityCache
+from klavia.metrics import Metrics
+from klavia.models import (
+    UserIdentity, CarStats, Car, Quest, UserQuestProgress, UserQuests, UserStatOverview, UserStats, Garage, Team,
+    ShopOffer, Shop
+)
+from klavia.parsers import (
+    GaragePage, TeamPage, parse_async, parse_display_name, parse_shop_section, parse_team, parse_racer_search,
+    parse_quests, parse_stats, parse_garage, parse_cars
+)
+from klavia.rate_limit import TokenBucket
+from klavia.response_cache import ResponseCache
+from klavia.search_cache import SearchCache
+from klavia.session import KlaviaSession, KlaviaResponse
+from klavia.urls import KlaviaUrls
+
+
+class AsyncCrawler(KlaviaUrls):
+    IdentityLookupConcurrency: Final[int] = 4
+    DisplayNameMaxAge: Final[float] = 60 * 10  # Display names resolved within this time are not resolved again.
+
+    def __init__(
+            self,
+            username: str = "",
+            password: str = "",
+            session: KlaviaSession | None = None,
+            identity_cache: IdentityCache | None = None,
+            car_catalogue_ttl: float = CarCatalogue.DefaultTtl,
+            response_cache: ResponseCache | None = None,
+            search_cache: SearchCache | None = None
+    ) -> None:
+        # Pass a shared session to reuse its login and connection pool. Login happens lazily on the first request.
+        self._session: KlaviaSession = session if session is not None else KlaviaSession(username, password)
+        self._identities: IdentityCache = identity_cache if identity_cache is not None else IdentityCache()
+        self._car_catalogue: CarCatalogue = CarCatalogue(self._fetch_cars_dict, car_catalogue_ttl)
+        self._responses: ResponseCache = response_cache if response_cache is not None else ResponseCache()
+        self._searches: SearchCache = search_cache if search_cache is not None else SearchCache()
+        self._changes: ChangeDetector = ChangeDetector()
+
+    @property
+    def car_catalogue(self) -> CarCatalogue:
+        return self._car_catalogue
+
+    @property
+    def identities(self) -> IdentityCache:
+        return self._identities
+
+    @property
+    def response_cache(self) -> ResponseCache:
+        return self._responses
+
+    @property
+    def search_cache(self) -> SearchCache:
+        return self._searches
+
+    @property
+    def session(self) -> KlaviaSession:
+        return self._session
+
+    async def close(self) -> None:
+        await self._session.close()
+
+    async def get_skins(self) -> None:
+        response: KlaviaResponse = await self._session.get(AsyncCrawler.CarSkinsUrl.format(car_id=1495))
         # TODO: implement
         return
 
-    def get_shop(self) -> Shop:
-        def get_section_offers(shop_section_url: str) -> list[ShopOffer]:
-            response: Response = self._session.get(shop_section_url)
-            soup: BeautifulSoup = BeautifulSoup(response.text, "html.parser")
-            offers_table = soup.find("div", attrs={"class": "row g-3"})
-            offers: list[ShopOffer] = []
-            for offer_div in offers_table.find_all("div", attrs={"class": "col-lg-6"}):
-                img_url: str = offer_div.find("div", attrs={"class": "mb-3"}).find("img").get("src")
-                offers.append(
-                    ShopOffer(
-                        name=offer_div.find("h4").get_text().strip("\n").split("\n")[0],
-                        price=int(offer_div.find("strong").get_text().replace(",", "")),
-                        image_url=(Crawler.KlaviaUrl if img_url[0] == "/" else "") + img_url
-                    )
-                )
-            return offers
-
-        return Shop(
-            seasonal_offers=get_section_offers(Crawler.ShopSeasonUrl),
-            alices_deals=get_section_offers(Crawler.ShopDealsUrl)
+    async def get_shop(self, fresh: bool = False) -> Shop:
+        return (await self.watch_shop(fresh))[0]
+
+    @Metrics.timed("klavia_crawler_seconds", endpoint="get_shop")
+    async def watch_shop(self, fresh: bool = False) -> tuple[Shop, bool]:
+        # Also returns whether the offers have changed since the last call. Unchanged sections are not parsed again,
+        # unless fresh is set.
+        async def get_section_offers(shop_section_url: str) -> tuple[list[ShopOffer], bool]:
+            return await self._changes.get(
+                self._session,
+                shop_section_url,
+                lambda html: parse_async(parse_shop_section, html),
+                fresh,
+                lambda offers: [offer.name for offer in offers]
+            )
+
+        seasonal_offers: list[ShopOffer]
+        alices_deals: list[ShopOffer]
+        (seasonal_offers, seasonal_changed), (alices_deals, deals_changed) = await gather(
+            get_section_offers(AsyncCrawler.ShopSeasonUrl),
+            get_section_offers(AsyncCrawler.ShopDealsUrl)
         )
+        return Shop(seasonal_offers=seasonal_offers, alices_deals=alices_deals), seasonal_changed or deals_changed
 
-    def get_team(self, tag: str) -> Team:
+    async def get_team(self, tag: str, fresh: bool = False) -> Team:
+        return (await self.watch_team(tag, fresh))[0]
+
+    @Metrics.timed("klavia_crawler_seconds", endpoint="get_team")
+    async def watch_team(self, tag: str, fresh: bool = False) -> tuple[Team, bool]:
+        # Also returns whether members or roles have changed since the last call. Unchanged pages are not parsed again,
+        # unless fresh is set.
         tag = tag.upper()
-        response: Response = self._session.get(Crawler.TeamsUrl.format(team_tag=tag))
-        soup: BeautifulSoup = BeautifulSoup(response.text, "html.parser")
+        return await self._changes.get(
+            self._session,
+            AsyncCrawler.TeamsUrl.format(team_tag=tag),
+            lambda html: self._build_team(tag, html),
+            fresh,
+            lambda team: (
+                team.leader.id,
+                sorted(agent.id for agent in team.agents),
+                sorted(member.id for member in team.members)
+            )
+        )
+
+    async def _build_team(self, tag: str, html: str) -> Team:
+        page: TeamPage = await parse_async(parse_team, html)
 
-        name: str = soup.find("h1").get_text(strip=True)
+        # Display names are resolved through the identity lookup, not taken from the team table's link text. That the
+        # link text is the display name has not been checked against recorded pages yet. (See tools.parser_parity)
+        found: dict[str, UserIdentity] = await self.get_identities([row.racer_id for row in page.rows])
 
         leader: UserIdentity
         agents: list[UserIdentity] = []
         members: list[UserIdentity] = []
-        member_table: Tag = soup.find("table", attrs={"id": "tbl-daily-tracker"})
-        member_table_body: Tag = member_table.find("tbody")
-        for tr in member_table_body.find_all("tr"):
-            racer: Tag; squad: Tag; joined: Tag; last_race: Tag; team_races: Tag  # noqa  Ugly, but type hints. :(
-            racer, squad, joined, last_race, team_races = tr.find_all("td")[:5]
-            # racer:
-            racer_id: str = racer.find("a")["href"].split("/")[-1]
-            badge: Tag | None = racer.find("div", attrs={"class": "badge"})
-            identity: UserIdentity = self.search_racer(racer_id)
+        for row in page.rows:
+            identity: UserIdentity = found[row.racer_id]
             members.append(identity)
-            if badge:
-                title = badge["title"]
-                if title == "Leader":
-                    leader = identity
-                elif title == "Agent":
-                    agents.append(identity)
+            if row.badge == "Leader":
+                leader = identity
+            elif row.badge == "Agent":
+                agents.append(identity)
 
         # noinspection PyUnboundLocalVariable
         return Team(
-            name=name,
+            name=page.name,
             tag=tag,
             leader=leader,
             agents=agents,
             members=members
         )
 
-    def search_racers(self, search: str) -> list[UserIdentity]:
-        response: Response = self._session.get(Crawler.SearchRacerUrl.format(search=search))
-        data: list[tuple[int, str, str]] = response.json()
-        # Sort by similarity to search string. (descending) Klavia's sorting is pretty random...
-        data = sorted(data, key=lambda x: SequenceMatcher(None, x[2], search).real_quick_ratio(), reverse=True)
-        return [
-            UserIdentity(
-                id=str(d[0]),
-                display_name=d[1],
-                username=d[2]
-            ) for d in data
-        ]
-
-    def search_racer(self, search: str) -> UserIdentity | None:
-        findings: list[UserIdentity] = self.search_racers(search)
+    @Metrics.timed("klavia_crawler_seconds", endpoint="get_identity")
+    async def get_identity(self, racer_id: str) -> UserIdentity:
+        identity: UserIdentity | None = self._identities.get(racer_id)
+        if identity is None:
+            await self.search_racers(racer_id)  # Fills the identity cache.
+            identity = self._identities.get(racer_id)
+        if identity is None:
+            # Klavia did not return this racer. Fall back to its id, so that it can still be displayed.
+            identity = UserIdentity(id=racer_id, display_name=racer_id, username="")
+        return identity
+
+    async def get_identities(self, racer_ids: list[str]) -> dict[str, UserIdentity]:
+        semaphore: Semaphore = Semaphore(AsyncCrawler.IdentityLookupConcurrency)
+
+        async def lookup(racer_id: str) -> UserIdentity:
+            async with semaphore:
+                return await self.get_identity(racer_id)
+
+        identities: list[UserIdentity] = await gather(*[lookup(racer_id) for racer_id in dict.fromkeys(racer_ids)])
+        return {identity.id: identity for identity in identities}
+
+    @Metrics.timed("klavia_crawler_seconds", endpoint="get_display_name")
+    async def get_display_name(self, racer_id: str, rate_limit: TokenBucket | None = None) -> str:
+        identity: UserIdentity | None = self._identities.get(racer_id, AsyncCrawler.DisplayNameMaxAge)
+        if identity is not None and identity.display_name:
+            return identity.display_name
+
+        # Cheapest source: The autocomplete endpoint returns a small JSON list. (Fills the identity cache.)
+        if rate_limit is not None:
+            await rate_limit.acquire()
+        await self.search_racers(racer_id, fresh=True)
+        identity = self._identities.get(racer_id, AsyncCrawler.DisplayNameMaxAge)
+        if identity is not None and identity.display_name:
+            return identity.display_name
+
+        # Fallback: The header of the racer's profile page.
+        if rate_limit is not None:
+            await rate_limit.acquire()
+        response: KlaviaResponse = await self._session.get(AsyncCrawler.RacerUrl.format(user_id=racer_id))
+        display_name: str = await parse_async(parse_display_name, response.text)
+        self._identities.put(UserIdentity(id=racer_id, display_name=display_name, username=""))
+        return display_name
+
+    async def get_display_names(self, racer_ids: list[str], rate_limit: TokenBucket | None = None) -> dict[str, str]:
+        # Racers that cannot be resolved are left out.
+        semaphore: Semaphore = Semaphore(AsyncCrawler.IdentityLookupConcurrency)
+        display_names: dict[str, str] = {}
+
+        async def resolve(racer_id: str) -> None:
+            async with semaphore:
+                try:
+                    display_names[racer_id] = await self.get_display_name(racer_id, rate_limit)
+                except Exception as ex:
+                    print(f"Cannot resolve display name of racer {racer_id}: {ex}")
+
+        await gather(*[resolve(racer_id) for racer_id in dict.fromkeys(racer_ids)])
+        return display_names
+
+    @Metrics.timed("klavia_crawler_seconds", endpoint="search_racers")
+    async def search_racers(self, search: str, fresh: bool = False) -> list[UserIdentity]:
+        # Repeated and refined searches are answered from the search cache. Klavia is only asked for new or stale
+        # queries. Cached results are completed by the identity index.
+        racers: list[UserIdentity] | None = None if fresh else self._searches.get(search)
+        if racers is not None:
+            return self._identities.merge(search, racers)
+        response: KlaviaResponse = await self._session.get(AsyncCrawler.SearchRacerUrl.format(search=search))
+        racers = await parse_async(parse_racer_search, response.text, search)
+        self._searches.put(search, racers)
+        self._identities.put_all(racers)
+        return racers
+
+    async def search_racer(self, search: str) -> UserIdentity | None:
+        # An exact id or username match is already known -> No search required. (Display names are not unique)
+        known: UserIdentity | None = self._identities.find(search)
+        if known is not None:
+            Metrics.increment("klavia_identity_index_total", result="hit")
+            return known
+        findings: list[UserIdentity] = await self.search_racers(search)
         racer: UserIdentity | None = None
         if len(findings) > 0:
             racer = findings[0]
         return racer
 
-    def get_quests(self, user_id: str) -> UserQuests:
-        response: Response = self._session.get(Crawler.QuestsUrl.format(user_id=user_id))
-        soup: BeautifulSoup = BeautifulSoup(response.text, "html.parser")
-        username: str = soup.find("h3").get_text(strip=True)
-
-        quest_names: list[str] = [q.text for q in soup.find_all("a", attrs={"data-turbo-frame": "modal"}) if len]
-        try:
-            quest_names[0] = soup.find("h5").get_text(strip=True)
-        except AttributeError:
-            pass  # No active quest! -> ignore
-        quest_progs: list[int] = [
-            int(p.get("data-progress-percentage-value"))
-            for p in soup.find_all("div", attrs={"data-controller": "progress"})
-        ]
-        quest_progress: list[UserQuestProgress] = [
-            UserQuestProgress(
-                Quest(
-                    name=name
-                ),
-                progress=prog
-            ) for name, prog in zip(quest_names, quest_progs)
-        ]
-
-        return UserQuests(
-            user_id=user_id,
-            display_name=username,
-            quest_progress=quest_progress
-        )
+    @Metrics.timed("klavia_crawler_seconds", endpoint="get_quests")
+    async def get_quests(self, user_id: str, fresh: bool = False) -> UserQuests:
+        return await self._responses.get("quests", user_id, lambda: self._fetch_quests(user_id), fresh)
 
-    def get_stats(self, user_id: str) -> UserStats:
-        response: Response = self._session.get(Crawler.RacerUrl.format(user_id=user_id))
-        soup: BeautifulSoup = BeautifulSoup(response.text, "html.parser")
-        username: str = soup.find("h3").get_text(strip=True)
-
-        try:
-            main_stats: list[Tag] = soup.find_all("strong")
-            lifetime_races: int = int(main_stats[0].get_text(strip=True).split(" ")[0].replace(",", ""))
-            top_wpm: float = float(main_stats[1].get_text(strip=True).split(" ")[0])
-            perfect_acc: int = int(main_stats[2].get_text(strip=True))
-
-            def get_minor_stat(s: BeautifulSoup, label: str) -> str:
-                for td in soup.find_all("td"):
-                    if td.get_text(strip=True).startswith(label):
-                        value_td = td.find_next_sibling("td")
-                        if value_td:
-                            return value_td.get_text(strip=True)
-                return "-1"
-
-            longest_session: int = int(get_minor_stat(soup, "Longest Session").split()[0].replace(",", ""))
-            current_wpm: float = float(get_minor_stat(soup, "Current Speed").split()[0])
-            current_acc: float = float(get_minor_stat(soup, "Current Accuracy").strip("%"))
-
-            return UserStats(
-                user_id=user_id,
-                display_name=username,
-                overview=UserStatOverview(
-                    lifetime_races=lifetime_races,
-                    longest_session=longest_session,
-                    top_wpm=top_wpm,
-                    current_wpm=current_wpm,
-                    perfect_races=perfect_acc,
-                    current_acc=current_acc
-                )
-            )
-        except IndexError:
-            # User might not have stats, yet.
-            return UserStats(
-                user_id=user_id,
-                display_name=username,
-                overview=UserStatOverview(
-                    lifetime_races=0,
-                    longest_session=0,
-                    top_wpm=0,
-                    current_wpm=0,
-                    perfect_races=0,
-                    current_acc=0
-                )
-            )
+    async def _fetch_quests(self, user_id: str) -> UserQuests:
+        response: KlaviaResponse = await self._session.get(AsyncCrawler.QuestsUrl.format(user_id=user_id))
+        return await parse_async(parse_quests, response.text, user_id)
 
-    def get_garage(self, user_id: str) -> Garage:
-        response: Response = self._session.get(Crawler.GarageUrl.format(user_id=user_id))
-        soup: BeautifulSoup = BeautifulSoup(response.text, "html.parser")
-        username: str = soup.find("h3").get_text(strip=True)
-        available_cars: dict[str, Car] = self.get_cars_dict()
+    @Metrics.timed("klavia_crawler_seconds", endpoint="get_stats")
+    async def get_stats(self, user_id: str, fresh: bool = False) -> UserStats:
+        return await self._responses.get("stats", user_id, lambda: self._fetch_stats(user_id), fresh)
+
+    async def _fetch_stats(self, user_id: str) -> UserStats:
+        response: KlaviaResponse = await self._session.get(AsyncCrawler.RacerUrl.format(user_id=user_id))
+        return await parse_async(parse_stats, response.text, user_id)
+
+    @Metrics.timed("klavia_crawler_seconds", endpoint="get_garage")
+    async def get_garage(self, user_id: str, fresh: bool = False) -> Garage:
+        # Use fresh=True, if the caller must see changes made within the last minute. (e.g. verification)
+        return await self._responses.get("garage", user_id, lambda: self._fetch_garage(user_id), fresh)
+
+    async def _fetch_garage(self, user_id: str) -> Garage:
+        response: KlaviaResponse
+        response, _ = await gather(
+            self._session.get(AsyncCrawler.GarageUrl.format(user_id=user_id)),
+            self._car_catalogue.get()
+        )
+        page: GaragePage = await parse_async(parse_garage, response.text)
+
+        # Refreshes the catalogue on demand, if the garage contains a car that we do not know yet:
+        available_cars: dict[str, Car] = await self._car_catalogue.get_including(
+            page.car_names + [page.selected_car_name]
+        )
         cars: list[Car] = []
-        for car_tag in soup.find_all("a", attrs={"data-turbo-frame": "selected_car"}):
-            name: str = car_tag.get("title").split("|")[0].strip()
+        for name in page.car_names:
             car: Car | None = available_cars.get(name, None)
             if car:
                 cars.append(car)
@@ -296,85 +266,76 @@ class Crawler:
                 # Cannot find car -> Ignore for now
                 # Might do some error logging in the future...
                 pass
-        selected_car: Car = available_cars.get(
-            soup
-            .find("div", id="selected_car")
-            .find("div", class_="card-header")
-            .find(text=True, recursive=False)
-            .strip(),
-            list(available_cars.values())[0]
-        )
-
-        try:
-            selected_stats_table: Tag = soup.find("tbody")
-            selected_stats_elems: ResultSet[Tag] = selected_stats_table.find_all("td", attrs={"class": "text-end"})
-
-            # noinspection PyCallingNonCallable
-            selected_stats: CarStats = CarStats(
-                races=int(selected_stats_elems[0].getText(strip=True)),
-                dqs=int(selected_stats_elems[1].getText(strip=True)),
-                avg_wpm=float(selected_stats_elems[2].getText(strip=True)),
-                avg_acc=float(selected_stats_elems[3].getText(strip=True)[:-1]),
-                top_wpm=float(selected_stats_elems[4].getText(strip=True)),
-                top_acc=float(selected_stats_elems[5].getText(strip=True)[:-1]),
-                perf_acc=int(selected_stats_elems[6].getText(strip=True))
-            )
-        except AttributeError:
-            # User might have no stats, yet.
-            selected_stats: CarStats = CarStats(
-                races=0,
-                dqs=0,
-                avg_wpm=0,
-                avg_acc=0,
-                top_wpm=0,
-                top_acc=0,
-                perf_acc=0
-            )
+        selected_car: Car = available_cars.get(page.selected_car_name, list(available_cars.values())[0])
 
         return Garage(
             user_id=user_id,
-            display_name=username,
+            display_name=page.display_name,
             cars=cars,
             selected_car=selected_car,
-            selected_stats=selected_stats
+            selected_stats=page.selected_stats
         )
 
+    @Metrics.timed("klavia_crawler_seconds", endpoint="get_cars_dict")
+    async def get_cars_dict(self) -> dict[str, Car]:
+        return dict(await self._car_catalogue.get())
+
+    async def _fetch_cars_dict(self) -> dict[str, Car]:
+        response: KlaviaResponse = await self._session.get(AsyncCrawler.CarsUrl)
+        return await parse_async(parse_cars, response.text)
+
+    async def get_cars(self) -> list[Car]:
+        return list((await self.get_cars_dict()).values())
+
+
+class Crawler(KlaviaUrls):
+    # Blocking wrapper around AsyncCrawler for scripts. Never use this from within the bot's event loop!
+
+    def __init__(self, username: str = "", password: str = "", session: KlaviaSession | None = None) -> None:
+        self._runner: Runner = Runner()
+        self._crawler: AsyncCrawler = AsyncCrawler(username, password, session)
+
+    @property
+    def search_cache(self) -> SearchCache:
+        return self._crawler.search_cache
+
+    @property
+    def session(self) -> KlaviaSession:
+        return self._crawler.session
+
+    def close(self) -> None:
+        self._runner.run(self._crawler.close())
+        self._runner.close()
+
+    def get_skins(self) -> None:
+        return self._runner.run(self._crawler.get_skins())
+
+    def get_shop(self) -> Shop:
+        return self._runner.run(self._crawler.get_shop())
+
+    def get_team(self, tag: str) -> Team:
+        return self._runner.run(self._crawler.get_team(tag))
+
+    def search_racers(self, search: str) -> list[UserIdentity]:
+        return self._runner.run(self._crawler.search_racers(search))
+
+    def search_racer(self, search: str) -> UserIdentity | None:
+        return self._runner.run(self._crawler.search_racer(search))
+
+    def get_quests(self, user_id: str) -> UserQuests:
+        return self._runner.run(self._crawler.get_quests(user_id))
+
+    def get_stats(self, user_id: str) -> UserStats:
+        return self._runner.run(self._crawler.get_stats(user_id))
+
+    def get_garage(self, user_id: str) -> Garage:
+        return self._runner.run(self._crawler.get_garage(user_id))
+
     def get_cars_dict(self) -> dict[str, Car]:
-        response: Response = self._session.get(Crawler.CarsUrl)
-        soup: BeautifulSoup = BeautifulSoup(response.text, "html.parser")
-        cars: dict[str, Car] = {}
-        for car_tr in soup.find_all("tr")[1:]:
-            image: Tag = car_tr.find("img")
-            name: str = image.attrs["title"].strip()
-            cars[name] = Car(
-                name=name,
-                image_url=image.attrs["src"]
-            )
-        return cars
+        return self._runner.run(self._crawler.get_cars_dict())
 
     def get_cars(self) -> list[Car]:
-        return list(self.get_cars_dict().values())
-
-    @staticmethod
-    def _login(username: str, password: str) -> Session:
-        session: Session = Session()
-
-        login_page: Response = session.get(Crawler.KlaviaUrl)
-        login_soup: BeautifulSoup = BeautifulSoup(login_page.text, "html.parser")
-        csrf_token: str = login_soup.find("meta", {"name": "csrf-token"})["content"]
-
-        login_response: Response = session.post(
-            url=Crawler.SignInUrl,
-            data={
-                "authenticity_token": csrf_token,
-                "racer[email]": username,
-                "racer[password]": password,
-                "racer[remember_me]": "0",
-                "commit": "Sign+In"
-            }
-        )
-
-        return session
+        return self._runner.run(self._crawler.get_cars())
 
 
 if __name__ == '__main__':
@@ -391,3 +352,4 @@ if __name__ == '__main__':
     # crawler.get_team("vyn")
     # crawler.get_skins()
     crawler.get_shop()
+    crawler.close()
@@ -0,0 +1,47 @@
+from typing import Final
+
+from discord import AutocompleteContext, Option, OptionChoice
+
+from crawler import UserIdentity
+from dscrd_bot.persistent_data import Persistence
+from dscrd_bot.util import get_crawler
+from klavia.identities import similarity
+from klavia.metrics import Metrics
+
+
+MaxChoices: Final[int] = 25  # Discord limits
+MaxChoiceLength: Final[int] = 100
+Candidates: Final[int] = MaxChoices * 2  # Ranked once more, so that racers linked on the server come first.
+SuggestionMaxAge: Final[float] = 60 * 60 * 24 * 7  # Old names are still better suggestions than none.
+LinkedBonus: Final[float] = .1
+
+
+def to_choice(identity: UserIdentity) -> OptionChoice:
+    # The value is something that get_identity() finds in the identity index without asking Klavia.
+    name: str = f"{identity.display_name} ({identity.username or '#' + identity.id})"
+    return OptionChoice(name=name[:MaxChoiceLength], value=(identity.username or identity.id)[:MaxChoiceLength])
+
+
+async def autocomplete_klavia_name(ctx: AutocompleteContext) -> list[OptionChoice]:
+    # Suggestions come from the identity index only: Verified users (filled by the user sync), team members,
+    # and recently searched racers. Klavia is never asked, so that Discord's three second deadline is always met.
+    with Metrics.time("klaval_autocomplete_seconds"):
+        query: str = str(ctx.value or "").strip()
+        server_id: str = str(ctx.interaction.guild_id)
+
+        def rank(identity: UserIdentity) -> float:
+            linked: bool = len(Persistence.get_linked_users(identity.id, server_id)) > 0
+            return similarity(query, identity) + (LinkedBonus if linked else 0)
+
+        identities: list[UserIdentity]
+        if query:
+            identities = get_crawler().identities.search(query, Candidates, SuggestionMaxAge)
+        else:
+            identities = get_crawler().identities.recent(Candidates, SuggestionMaxAge)
+        identities = sorted(identities, key=rank, reverse=True)[:MaxChoices]
+        return [to_choice(identity) for identity in identities]
+
+
+def klavia_name_option(required: bool = True) -> Option:
+    # A new option per command, because py-cord writes the parameter's default into the option.
+    return Option(str, "Klavia user name", autocomplete=autocomplete_klavia_name, required=required)
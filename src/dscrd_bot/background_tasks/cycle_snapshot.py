@@ -0,0 +1,58 @@
+from asyncio import Semaphore, gather
+from typing import Final
+
+from crawler import Team, Shop
+from dscrd_bot.persistent_data import Server
+from dscrd_bot.util import get_crawler
+
+
+def group_servers_by_team(servers: list[Server]) -> dict[str, list[Server]]:
+    # Several servers may link the same Klavia team (e.g. a main and a practice server).
+    groups: dict[str, list[Server]] = {}
+    for server in servers:
+        if server.linked_team:
+            groups.setdefault(server.linked_team.tag.upper(), []).append(server)
+    return groups
+
+
+class CycleSnapshot:
+    # Klavia state of one scheduled run. Notify and persist tasks share it, so that every page is scraped only once
+    # per run and the persisted state always matches the state that notifications have been sent for.
+    TeamScrapeConcurrency: Final[int] = 4
+
+    def __init__(self) -> None:
+        self._teams: dict[str, Team] = {}
+        self._failed_tags: set[str] = set()
+        self._shop: Shop | None = None
+        self._changed: bool = False
+
+    @property
+    def changed(self) -> bool:
+        # Whether any page scraped in this run has changed since it has been scraped the last time.
+        return self._changed
+
+    async def get_teams(self, tags: list[str]) -> dict[str, Team]:
+        # Scrapes every distinct team once. Teams that could not be scraped are left out for the rest of the run.
+        semaphore: Semaphore = Semaphore(CycleSnapshot.TeamScrapeConcurrency)
+
+        async def load(tag: str) -> None:
+            async with semaphore:
+                try:
+                    changed: bool
+                    self._teams[tag], changed = await get_crawler().watch_team(tag)
+                    self._changed |= changed
+                except Exception as ex:
+                    # Must catch everything, so that one broken team does not stop the others.
+                    self._failed_tags.add(tag)
+                    print(f"Cannot scrape team {tag}: {ex}")
+
+        distinct_tags: list[str] = list(dict.fromkeys(t.upper() for t in tags))
+        await gather(*[load(tag) for tag in distinct_tags if tag not in self._teams and tag not in self._failed_tags])
+        return {tag: self._teams[tag] for tag in distinct_tags if tag in self._teams}
+
+    async def get_shop(self) -> Shop:
+        if self._shop is None:
+            changed: bool
+            self._shop, changed = await get_crawler().watch_shop()
+            self._changed |= changed
+        return self._shop
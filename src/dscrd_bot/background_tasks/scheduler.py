@@ -0,0 +1,135 @@
+from asyncio import Event, Task, TimeoutError, create_task, sleep, wait_for
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from enum import StrEnum
+from random import uniform
+from typing import Awaitable, Callable, Final
+
+from dscrd_bot.util import get_crawler
+from klavia.metrics import Metrics
+from klavia.transport import RequestPriority, request_priority
+
+
+def seconds_until_daily(times: list[tuple[int, int]]) -> float:
+    # Seconds until the next of the given daily (hour, minute) times in UTC.
+    now: datetime = datetime.now(UTC)
+    waits: list[float] = []
+    for hour, minute in times:
+        at: datetime = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if at <= now:
+            at += timedelta(days=1)
+        waits.append((at - now).total_seconds())
+    return min(waits)
+
+
+class OverlapPolicy(StrEnum):
+    Skip = "skip"  # A run that is due while the previous one is still running is dropped.
+    Queue = "queue"  # ... is started as soon as the previous one has finished. (At most one run is queued.)
+
+
+@dataclass
+class ScheduledTask:
+    name: str
+    job: Callable[[], Awaitable[bool | None]]  # Adaptive tasks return whether their run has seen a change.
+    interval: float  # Seconds between two runs.
+    jitter: float = .1  # +- 10 % of the interval, so that tasks with the same interval drift apart.
+    timeout: float | None = None  # Runs that take longer are cancelled.
+    overlap: OverlapPolicy = OverlapPolicy.Skip
+    initial_delay: float = 0
+    # Adaptive tasks: Every run without a change stretches the interval by <backoff>, up to <max_interval>.
+    # A change resets it to <interval>.
+    max_interval: float | None = None
+    backoff: float = 1.5
+    next_event: Callable[[], float] | None = None  # Seconds until a known change. (e.g. shop rotation)
+
+
+class Scheduler:
+    # Runs every registered task on its own schedule. Tasks run concurrently and never block each other.
+    EventDelay: Final[float] = 30  # Runs for known events are started this many seconds after the event.
+
+    def __init__(self) -> None:
+        self._tasks: dict[str, ScheduledTask] = {}
+        self._loops: dict[str, Task] = {}
+        self._running: dict[str, Task] = {}
+        self._queued: set[str] = set()
+        self._intervals: dict[str, float] = {}  # Current interval of adaptive tasks.
+        self._tightened: dict[str, Event] = {}  # Set, if the interval of a sleeping task has been shortened.
+
+    def register(self, task: ScheduledTask) -> None:
+        self._tasks[task.name] = task
+
+    def start(self) -> None:
+        # May be called again. (e.g. on_ready after a reconnect) Tasks that are already scheduled keep their schedule.
+        for name, task in self._tasks.items():
+            if name not in self._loops or self._loops[name].done():
+                self._loops[name] = create_task(self._schedule(task))
+
+    def stop(self) -> None:
+        for loop in self._loops.values():
+            loop.cancel()
+        for run in self._running.values():
+            run.cancel()
+        self._loops.clear()
+        self._running.clear()
+        self._queued.clear()
+
+    async def _schedule(self, task: ScheduledTask) -> None:
+        await sleep(task.initial_delay)
+        while True:
+            running: Task | None = self._running.get(task.name, None)
+            if running is None or running.done():
+                self._running[task.name] = create_task(self._run(task))
+            elif task.overlap == OverlapPolicy.Queue:
+                self._queued.add(task.name)
+            else:
+                print(f"Skip scheduled task {task.name}, because its previous run has not finished yet.")
+                Metrics.increment("klaval_scheduled_task_skipped_total", task=task.name)
+            await self._sleep(task)
+
+    async def _sleep(self, task: ScheduledTask) -> None:
+        tightened: Event = self._tightened.setdefault(task.name, Event())
+        while True:
+            delay: float = self._intervals.get(task.name, task.interval) * (1 + uniform(-task.jitter, task.jitter))
+            if task.next_event is not None:
+                delay = min(delay, task.next_event() + Scheduler.EventDelay)
+            tightened.clear()
+            try:
+                await wait_for(tightened.wait(), timeout=delay)
+            except TimeoutError:
+                return
+
+    async def _run(self, task: ScheduledTask) -> None:
+        while True:
+            print(f"Start scheduled task {task.name}.")
+            changed: bool | None = None
+            try:
+                with Metrics.time("klaval_scheduled_task_seconds", task=task.name):
+                    with request_priority(RequestPriority.Background):  # Klavia requests of commands go first.
+                        changed = await wait_for(task.job(), timeout=task.timeout)
+            except TimeoutError:
+                print(f"Scheduled task {task.name} timed out after {task.timeout} seconds.")
+            except Exception as ex:
+                # Rather broad exception than stopping the schedule.
+                print(f"Scheduled task {task.name} failed: ", ex)
+            finally:
+                print(
+                    f"Scheduled task {task.name} finished. "
+                    f"(Klavia logins: {get_crawler().session.login_count}, "
+                    f"requests: {get_crawler().session.request_count})"
+                )
+            if task.max_interval is not None and changed is not None:
+                self._adapt(task, changed)
+
+            if task.name not in self._queued:
+                return
+            self._queued.discard(task.name)
+
+    def _adapt(self, task: ScheduledTask, changed: bool) -> None:
+        previous: float = self._intervals.get(task.name, task.interval)
+        interval: float = task.interval
+        if not changed:
+            interval = min(previous * task.backoff, task.max_interval)
+        self._intervals[task.name] = interval
+        if interval < previous and task.name in self._tightened:
+            self._tightened[task.name].set()  # Do not wait for the rest of the long interval.
+        Metrics.set("klaval_scheduled_task_interval_seconds", interval, task=task.name)
@@ -1,17 +1,17 @@
-from asyncio import sleep
-
 from discord import Bot
 from discord.abc import GuildChannel
 
 from crawler import Shop, ShopOffer
+from dscrd_bot.background_tasks.cycle_snapshot import CycleSnapshot
 from dscrd_bot.embeds import DefaultEmbed
+from dscrd_bot.notifications import get_dispatcher
 from dscrd_bot.persistent_data import Persistence, Server
-from dscrd_bot.util import get_crawler
 
 
-async def notify_new_offer(offer: ShopOffer, shop_section: str, channel: GuildChannel, server: Server) -> None:
-    await channel.send(
-        embed=DefaultEmbed(
+def notify_new_offer(offer: ShopOffer, shop_section: str, channel: GuildChannel, server: Server) -> None:
+    get_dispatcher().enqueue(
+        channel,
+        DefaultEmbed(
             title=f"{shop_section} Update",
             description=(
                 f"**{offer.name}** (*{offer.price} Cinders*) has been added to the shop."
@@ -23,8 +23,8 @@ async def notify_new_offer(offer: ShopOffer, shop_section: str, channel: GuildCh
     )
 
 
-async def task_notify_shop_update(bot: Bot) -> None:
-    shop: Shop = get_crawler().get_shop()
+async def task_notify_shop_update(bot: Bot, snapshot: CycleSnapshot) -> None:
+    shop: Shop = await snapshot.get_shop()
     shop_changed = not all(o.name in Persistence.get().shop_offers for o in shop.alices_deals + shop.seasonal_offers)
     if not shop_changed:
         return
@@ -38,13 +38,12 @@ async def task_notify_shop_update(bot: Bot) -> None:
 
                 for offer in shop.seasonal_offers:
                     if offer.name not in Persistence.get().shop_offers:
-                        await notify_new_offer(offer, "Season Shop", channel, server)
+                        notify_new_offer(offer, "Season Shop", channel, server)
 
                 for offer in shop.alices_deals:
                     if offer.name not in Persistence.get().shop_offers:
-                        await notify_new_offer(offer, "Alices Deals", channel, server)
-
-            await sleep(.5)  # Give bot some time to handle more important stuff.
+                        notify_new_offer(offer, "Alices Deals", channel, server)
         except Exception as ex:
             # Must catch everything to avoid crash!
             print(f"Cannot notify server ({server.id}) for shop updates: {ex}")
+    await get_dispatcher().join()  # Notifications are sent concurrently, but the task ends only once they are out.
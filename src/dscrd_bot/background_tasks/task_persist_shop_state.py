@@ -1,9 +1,9 @@
 from crawler import Shop
+from dscrd_bot.background_tasks.cycle_snapshot import CycleSnapshot
 from dscrd_bot.persistent_data import Persistence
-from dscrd_bot.util import get_crawler
 
 
-async def task_persist_shop_state() -> None:
-    shop: Shop = get_crawler().get_shop()
-    Persistence.get().shop_offers = [offer.name for offer in shop.seasonal_offers + shop.alices_deals]
+async def task_persist_shop_state(snapshot: CycleSnapshot) -> None:
+    shop: Shop = await snapshot.get_shop()
+    Persistence.set_shop_offers([offer.name for offer in shop.seasonal_offers + shop.alices_deals])
     Persistence.write()
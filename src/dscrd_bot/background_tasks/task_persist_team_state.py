@@ -1,6 +1,6 @@
 from crawler import Team, UserIdentity
-from dscrd_bot.persistent_data import Persistence, CachedTeamMember, CachedTeamState, TeamMemberRole
-from dscrd_bot.util import get_crawler
+from dscrd_bot.background_tasks.cycle_snapshot import CycleSnapshot, group_servers_by_team
+from dscrd_bot.persistent_data import Persistence, CachedTeamMember, CachedTeamState, TeamMemberRole, Server
 
 
 class TeamMemberRoleMapper:
@@ -13,13 +13,14 @@ class TeamMemberRoleMapper:
         return self._mapping.get(team_member.id, TeamMemberRole.Regular)
 
 
-async def task_persist_team_state() -> None:
-    for server in Persistence.get().servers:
-        if server.linked_team:
-            team: Team = get_crawler().get_team(server.linked_team.tag)
+async def task_persist_team_state(snapshot: CycleSnapshot) -> None:
+    servers_by_team: dict[str, list[Server]] = group_servers_by_team(Persistence.get().servers)
+    teams: dict[str, Team] = await snapshot.get_teams(list(servers_by_team.keys()))
+    for tag, team in teams.items():
+        role_mapper: TeamMemberRoleMapper = TeamMemberRoleMapper(team)
+        for server in servers_by_team[tag]:
             if not server.linked_team.cached_state:
                 server.linked_team.cached_state = CachedTeamState(members=[])
-            role_mapper: TeamMemberRoleMapper = TeamMemberRoleMapper(team)
             server.linked_team.cached_state.members = [
                 CachedTeamMember(
                     id=m.id,
@@ -27,4 +28,5 @@ async def task_persist_team_state() -> None:
                 )
                 for m in team.members
             ]
+            Persistence.mark_server_changed(server.id)
     Persistence.write()
@@ -1,17 +1,63 @@
-from asyncio import sleep
+from asyncio import Semaphore, gather
+from typing import Any, Coroutine, Final
 
-from discord import Bot, Guild, Forbidden
+from discord import Bot, Guild, Forbidden, HTTPException, Member
 
 from dscrd_bot.commands.sync import sync
-from dscrd_bot.persistent_data import Persistence
+from dscrd_bot.persistent_data import Persistence, User
+from dscrd_bot.util import get_crawler
+from klavia.rate_limit import TokenBucket
+
+
+SyncConcurrency: Final[int] = 8
+DiscordRequestsPerSecond: Final[float] = 4
+KlaviaRequestsPerSecond: Final[float] = 2
 
 
 async def task_sync_users(bot: Bot) -> None:
-    for server in Persistence.get().servers:
-        guild: Guild = await bot.fetch_guild(int(server.id))
-        for verified_user in server.verified_users:
+    semaphore: Semaphore = Semaphore(SyncConcurrency)
+    discord_limit: TokenBucket = TokenBucket(DiscordRequestsPerSecond)
+    klavia_limit: TokenBucket = TokenBucket(KlaviaRequestsPerSecond)
+
+    # Every racer is only resolved once per run, even if it is linked in several guilds:
+    display_names: dict[str, str] = await get_crawler().get_display_names(
+        list({u.klavia_id for server in Persistence.get().servers for u in server.verified_users}),
+        rate_limit=klavia_limit
+    )
+
+    async def sync_user(guild: Guild, verified_user: User) -> None:
+        async with semaphore:
             try:
-                await sync(await guild.fetch_member(int(verified_user.id)))
+                # Prefer the gateway cache. Only ask Discord, if the member is not cached.
+                member: Member | None = guild.get_member(int(verified_user.id))
+                if member is None:
+                    await discord_limit.acquire()
+                    member = await guild.fetch_member(int(verified_user.id))
+                if member.id == guild.owner_id:
+                    return  # Cannot edit owner profile through bots. :(
+
+                display_name: str | None = display_names.get(verified_user.klavia_id, None)
+                if display_name is None or member.nick == display_name:
+                    return  # Cannot resolve Klavia name or already in sync -> no need to edit.
+
+                await discord_limit.acquire()
+                await sync(member, display_name)
             except Forbidden:
                 print(f"Cannot sync! User: {verified_user.id} Guild: {guild.id}")
-            await sleep(.01)  # Give bot some time to handle important work.
+            except Exception as ex:
+                # Must catch everything, so that one user does not stop the synchronization of all others.
+                print(f"Cannot sync user {verified_user.id} in guild {guild.id}: {ex}")
+
+    jobs: list[Coroutine[Any, Any, None]] = []
+    for server in Persistence.get().servers:
+        guild: Guild | None = bot.get_guild(int(server.id))
+        if guild is None:
+            try:
+                await discord_limit.acquire()
+                guild = await bot.fetch_guild(int(server.id))
+            except HTTPException as ex:
+                # Left or unreachable guild. (NotFound, Forbidden, ...) Must not stop the sync of all other guilds.
+                print(f"Cannot sync guild {server.id}: {ex}")
+                continue
+        jobs += [sync_user(guild, verified_user) for verified_user in list(server.verified_users)]
+    await gather(*jobs)
@@ -4,16 +4,19 @@ from discord.ext.commands import Context
 from crawler import UserIdentity, Crawler
 from dscrd_bot.embeds import DefaultEmbed
 from dscrd_bot.persistent_data import Persistence, Server
-from dscrd_bot.util import get_crawler
+from dscrd_bot.util import get_crawler, klavia_check_passed
 
 
 async def command_find_racer(ctx: Context, klavia_name: str) -> None:
     await ctx.response.defer()
     server: Server = Persistence.get_server(str(ctx.guild.id))
 
+    if not await klavia_check_passed(ctx):
+        return
+
     max_display: int = 10
 
-    users: list[UserIdentity] = get_crawler().search_racers(klavia_name)
+    users: list[UserIdentity] = await get_crawler().search_racers(klavia_name)
 
     response: Embed = DefaultEmbed(
         title=f"User Search",
@@ -30,7 +33,7 @@ async def command_find_racer(ctx: Context, klavia_name: str) -> None:
 
     ids: str = "\n".join([f"[{u.id}]({Crawler.RacerUrl.format(user_id=u.id)})" for u in users])
     display_names: str = "\n".join([u.display_name for u in users])
-    usernames: str = "\n".join([u.username for u in users])
+    usernames: str = "\n".join([u.username or "-" for u in users])  # Unknown for racers only seen on team pages.
 
     response.add_field(
         name="",
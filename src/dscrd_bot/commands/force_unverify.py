@@ -14,8 +14,8 @@ async def command_force_unverify(ctx: Context, user: Member) -> None:
 
     if is_verified(user):
         # Persistence:
-        server.verified_users = [u for u in server.verified_users if u.id != user.id]
-        Persistence.write()
+        Persistence.remove_verified_user(server.id, str(user.id))
+        await Persistence.flush()
 
         # Roles
         role_verified: Role = get(ctx.author.guild.roles, name=str(HeBotRole.Verified))
@@ -5,7 +5,7 @@ from discord.utils import get
 from dscrd_bot.commands.sync import sync
 from dscrd_bot.embeds import OkayEmbed
 from dscrd_bot.roles import HeBotRole
-from dscrd_bot.persistent_data import Persistence, Server, User
+from dscrd_bot.persistent_data import Persistence, Server
 from dscrd_bot.util import is_verified
 
 
@@ -15,13 +15,8 @@ async def command_force_verify(ctx: Context, user: Member, klavia_id: str) -> No
     # Persistence:
     server: Server = Persistence.get_server(str(ctx.guild.id))
     if not is_verified(user):
-        server.verified_users.append(
-            User(
-                id=str(user.id),
-                klavia_id=klavia_id
-            )
-        )
-    Persistence.write()
+        Persistence.add_verified_user(server.id, str(user.id), klavia_id)
+    await Persistence.flush()
 
     # Assign roles:
     role_unverified: Role = get(user.guild.roles, name=HeBotRole.Unverified)
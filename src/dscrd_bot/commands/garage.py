@@ -4,7 +4,7 @@ from discord.ext.commands import Context
 from crawler import Garage, Car
 from dscrd_bot.embeds import DefaultEmbed
 from dscrd_bot.persistent_data import Persistence, Server
-from dscrd_bot.util import verification_check_passed, get_crawler, get_klavia_id_by_name, BlankLine
+from dscrd_bot.util import klavia_check_passed, verification_check_passed, get_crawler, get_klavia_id_by_name, BlankLine
 
 
 async def command_garage(ctx: Context, klavia_name: str = "") -> None:
@@ -14,11 +14,14 @@ async def command_garage(ctx: Context, klavia_name: str = "") -> None:
     if not await verification_check_passed(ctx):
         return
 
+    if not await klavia_check_passed(ctx):
+        return
+
     klavia_id: str | None = await get_klavia_id_by_name(ctx, klavia_name)
     if klavia_id is None:
         return
 
-    garage_data: Garage = get_crawler().get_garage(klavia_id)
+    garage_data: Garage = await get_crawler().get_garage(klavia_id)
 
     def cars(cols: int) -> list[list[Car]]:
         output: list[list[Car]] = [[] for _ in range(cols)]
@@ -6,7 +6,7 @@ from discord.ext.commands import Context
 from crawler import UserQuests
 from dscrd_bot.embeds import DefaultEmbed
 from dscrd_bot.persistent_data import Persistence, Server
-from dscrd_bot.util import verification_check_passed, get_crawler, get_klavia_id_by_name
+from dscrd_bot.util import klavia_check_passed, verification_check_passed, get_crawler, get_klavia_id_by_name
 
 
 async def command_quests(ctx: Context, klavia_name: str = "") -> None:
@@ -16,11 +16,14 @@ async def command_quests(ctx: Context, klavia_name: str = "") -> None:
     if not await verification_check_passed(ctx):
         return
 
+    if not await klavia_check_passed(ctx):
+        return
+
     klavia_id: str | None = await get_klavia_id_by_name(ctx, klavia_name)
     if klavia_id is None:
         return
 
-    quest_data: UserQuests = get_crawler().get_quests(klavia_id)
+    quest_data: UserQuests = await get_crawler().get_quests(klavia_id)
     response: Embed = DefaultEmbed(
         title=f"{quest_data.display_name}'s Quests:",
         custom_title=server.embed_author,
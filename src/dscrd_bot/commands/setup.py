@@ -23,6 +23,7 @@ def save_setup(
         server.welcome_channel = Channel(id=str(welcome_channel.id))
     server.embed_author = message_author
     server.embed_icon_url = message_icon_url
+    Persistence.mark_server_changed(server.id)
     Persistence.write()
 
 
@@ -80,7 +81,7 @@ class LinkTeamModal(Modal):
         await interaction.response.defer(ephemeral=True)
         tag: str = self._team_tag.value.strip()
         try:
-            team: Team = get_crawler().get_team(tag)
+            team: Team = await get_crawler().get_team(tag)
         except AttributeError:
             await interaction.respond(
                 embed=ErrorEmbed(
@@ -160,7 +161,8 @@ async def set_event_notification_channel(interaction: Interaction) -> None:
 
 async def finish_setup(interaction: Interaction) -> None:
     # save settings:
-    Persistence.write()
+    Persistence.mark_server_changed(str(interaction.guild.id))
+    await Persistence.flush()
 
     # create roles:
     existing_roles: list[str] = [r.name for r in interaction.guild.roles]
@@ -4,7 +4,7 @@ from discord.ext.commands import Context
 from crawler import UserStats
 from dscrd_bot.embeds import DefaultEmbed
 from dscrd_bot.persistent_data import Persistence, Server
-from dscrd_bot.util import verification_check_passed, get_crawler, get_klavia_id_by_name
+from dscrd_bot.util import klavia_check_passed, verification_check_passed, get_crawler, get_klavia_id_by_name
 
 
 async def command_stats(ctx: Context, klavia_name: str = "") -> None:
@@ -14,11 +14,14 @@ async def command_stats(ctx: Context, klavia_name: str = "") -> None:
     if not await verification_check_passed(ctx):
         return
 
+    if not await klavia_check_passed(ctx):
+        return
+
     klavia_id: str | None = await get_klavia_id_by_name(ctx, klavia_name)
     if klavia_id is None:
         return
 
-    stat_data: UserStats = get_crawler().get_stats(klavia_id)
+    stat_data: UserStats = await get_crawler().get_stats(klavia_id)
     response: Embed = DefaultEmbed(
         title=f"{stat_data.display_name}'s Stats:",
         custom_title=server.embed_author,
@@ -3,14 +3,17 @@ from discord.ext.commands import Context
 
 from dscrd_bot.embeds import OkayEmbed
 from dscrd_bot.persistent_data import Persistence, Server
-from dscrd_bot.util import get_crawler, verification_check_passed, get_klava_id
+from dscrd_bot.util import klavia_check_passed, get_crawler, verification_check_passed, get_klava_id
 
 
-async def sync(user: Member) -> None:
+async def sync(user: Member, display_name: str | None = None) -> None:
     klavia_id: str = get_klava_id(user)
     if user.id != user.guild.owner_id:
         # Cannot edit owner profile through bots. :(
-        await user.edit(nick=get_crawler().get_garage(klavia_id).display_name)
+        if display_name is None:
+            display_name = await get_crawler().get_display_name(klavia_id)
+        if user.nick != display_name:
+            await user.edit(nick=display_name)
 
 
 async def command_sync(ctx: Context) -> None:
@@ -20,6 +23,9 @@ async def command_sync(ctx: Context) -> None:
     if not await verification_check_passed(ctx):
         return
 
+    if not await klavia_check_passed(ctx):
+        return
+
     await sync(ctx.author)
 
     response: Embed = OkayEmbed(
@@ -21,8 +21,8 @@ async def command_unverify(ctx: Context) -> None:
     response: Embed
     if verified:
         # Persistence:
-        server.verified_users = [u for u in server.verified_users if u.id != ctx.author.id]
-        Persistence.write()
+        Persistence.remove_verified_user(server.id, str(ctx.author.id))
+        await Persistence.flush()
 
         # Roles
         await ctx.author.remove_roles(role_verified)
@@ -1,32 +1,25 @@
-from asyncio import sleep
 from random import choice
-from time import time
-from typing import Any, Final
+from typing import Any
 
 from discord import Role, Interaction
 from discord.ext.commands import Context
 from discord.utils import get
 
 from crawler import Garage, Car, UserIdentity
-from dscrd_bot.commands.sync import sync
-from dscrd_bot.embeds import DefaultEmbed, OkayEmbed, ErrorType, ErrorEmbed
+from dscrd_bot.embeds import DefaultEmbed, ErrorType, ErrorEmbed
 from dscrd_bot.roles import HeBotRole
-from dscrd_bot.persistent_data import Persistence, Server, User
+from dscrd_bot.persistent_data import Persistence, Server
 from dscrd_bot.ui.views.select_user_view import SelectUserView
-from dscrd_bot.util import get_crawler
-
-
-VerificationPollingRate: Final[int] = 30  # check for verification every <polling_rate> seconds
-VerificationTimeout: Final[int] = 60 * 5  # verification timeout in seconds
+from dscrd_bot.util import get_crawler, klavia_check_passed
+from dscrd_bot.verification_watcher import VerificationWatcher
 
 
 async def on_account_selected(interaction: Interaction, identity: UserIdentity) -> None:
-    role_verified: Role = get(interaction.guild.roles, name=str(HeBotRole.Verified))
-    role_unverified: Role = get(interaction.guild.roles, name=str(HeBotRole.Unverified))
     role_pending: Role = get(interaction.guild.roles, name=str(HeBotRole.VerificationPending))
 
     server: Server = Persistence.get_server(str(interaction.guild.id))
-    garage: Garage = get_crawler().get_garage(identity.id)
+    get_crawler().identities.put(identity)  # Keep the racers that are about to be verified in the index.
+    garage: Garage = await get_crawler().get_garage(identity.id, fresh=True)
 
     if len(garage.cars) <= 1:
         await interaction.respond(
@@ -50,7 +43,7 @@ async def on_account_selected(interaction: Interaction, identity: UserIdentity)
             description=(
                 f"{interaction.user.mention} "
                 f"To verify your account, please change your selected car in Klavia to **{random_car.name}**.\n"
-                f"Verification will take a minimum of {VerificationPollingRate} seconds."
+                f"Verification will take a minimum of {VerificationWatcher.InitialInterval:g} seconds."
             ),
             custom_title=server.embed_author,
             author_icon_url=server.embed_icon_url,
@@ -59,68 +52,8 @@ async def on_account_selected(interaction: Interaction, identity: UserIdentity)
         ephemeral=True
     )
     await interaction.user.add_roles(role_pending)
-
-    start_time: float = time()
-    timed_out: bool = False
-    verified: bool = False
-    while not verified and not timed_out:
-        await sleep(VerificationPollingRate)
-        car: Car = get_crawler().get_garage(identity.id).selected_car
-
-        if car.name == random_car.name:
-            verified = True
-
-            # Persistence:
-            server: Server = Persistence.get_server(str(interaction.guild.id))
-            server.verified_users.append(
-                User(
-                    id=str(interaction.user.id),
-                    klavia_id=identity.id
-                )
-            )
-            Persistence.write()
-
-            # Roles:
-            await interaction.user.remove_roles(role_unverified)
-            await interaction.user.add_roles(role_verified)
-            if interaction.user != interaction.guild.owner:
-                # Cannot edit owner profile through bots.
-                await interaction.user.edit(nick=get_crawler().get_garage(identity.id).display_name)
-
-        timed_out = time() >= start_time + VerificationTimeout
-
-    await interaction.user.remove_roles(role_pending)
-
-    await sync(interaction.user)
-
-    if verified:
-        await interaction.respond(
-            embed=OkayEmbed(
-                title="Verified",
-                description=(
-                    f"{interaction.user.mention} "
-                    f"You have been verified. You may now change your selected car to whatever you like."
-                ),
-                custom_title=server.embed_author,
-                author_icon_url=server.embed_icon_url
-            ),
-            ephemeral=True
-        )
-    else:
-        await interaction.respond(
-            embed=ErrorEmbed(
-                error_type=ErrorType.Timeout,
-                source=interaction.data.get("name"),
-                reason=(
-                    f"{interaction.user.mention}"
-                    f"Cannot verify your account.\n"
-                    f"Please try again later."
-                ),
-                custom_title=server.embed_author,
-                author_icon_url=server.embed_icon_url
-            ),
-            ephemeral=True
-        )
+    # Polling, roles, nickname and the final response are handled by the watcher:
+    await VerificationWatcher.watch(interaction, identity.id, random_car)
 
 
 async def command_verify(ctx: Context, klavia_name: str) -> Any:
@@ -151,7 +84,7 @@ async def command_verify(ctx: Context, klavia_name: str) -> Any:
                 description=(
                     f"{ctx.author.mention} "
                     f"You are currently being verified. Please be patient.\n"
-                    f"Verification will take a minimum of {VerificationPollingRate} seconds."
+                    f"Verification will take a minimum of {VerificationWatcher.InitialInterval:g} seconds."
                 ),
                 custom_title=server.embed_author,
                 author_icon_url=server.embed_icon_url
@@ -159,7 +92,9 @@ async def command_verify(ctx: Context, klavia_name: str) -> Any:
             ephemeral=True
         )
     elif not verified:
-        possible_identities: list[UserIdentity] = get_crawler().search_racers(klavia_name)
+        if not await klavia_check_passed(ctx):
+            return
+        possible_identities: list[UserIdentity] = await get_crawler().search_racers(klavia_name)
         if len(possible_identities) >= 25:
             possible_identities = possible_identities[:25]
 
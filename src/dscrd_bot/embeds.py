@@ -10,6 +10,7 @@ class ErrorType(StrEnum):
     Permission = "Permission Error"
     Timeout = "Timeout Error"
     Parameter = "Invalid Parameter"
+    Unavailable = "Klavia Unavailable"
 
 
 Quotes: Final[list[str]] = [
@@ -0,0 +1,93 @@
+from abc import ABC
+from asyncio import Semaphore, Task, create_task, gather, sleep
+from collections import deque
+from random import uniform
+from typing import Final
+
+from discord import Embed, Forbidden, NotFound
+from discord.abc import Messageable
+
+from klavia.metrics import Metrics
+
+
+class NotificationDispatcher:
+    # Queues notification embeds per channel. Every channel keeps its order, but different channels are served
+    # concurrently. Embeds that are queued for the same channel at about the same time are sent as one message.
+    MaxEmbedsPerMessage: Final[int] = 10  # Discord limits
+    MaxCharactersPerMessage: Final[int] = 6000
+    ChannelConcurrency: Final[int] = 8  # Messages in flight across all channels.
+    BatchDelay: Final[float] = 1  # Embeds queued within this time after the first one are merged.
+    MaxAttempts: Final[int] = 5
+    RetryDelay: Final[float] = 2  # Doubled after every failed attempt.
+
+    def __init__(self) -> None:
+        self._channels: dict[int, Messageable] = {}
+        self._queues: dict[int, deque[Embed]] = {}
+        self._workers: dict[int, Task] = {}
+        self._semaphore: Semaphore = Semaphore(NotificationDispatcher.ChannelConcurrency)
+
+    def enqueue(self, channel: Messageable, embed: Embed) -> None:
+        self._channels[channel.id] = channel
+        self._queues.setdefault(channel.id, deque()).append(embed)
+        if channel.id not in self._workers:
+            self._workers[channel.id] = create_task(self._work(channel.id))
+
+    async def join(self) -> None:
+        # Waits until every queued embed has been sent. (Or given up)
+        while self._workers:
+            await gather(*self._workers.values())
+
+    async def _work(self, channel_id: int) -> None:
+        try:
+            await sleep(NotificationDispatcher.BatchDelay)
+            queue: deque[Embed] = self._queues[channel_id]
+            while queue:
+                batch: list[Embed] = [queue.popleft()]
+                characters: int = len(batch[0])
+                while (
+                        queue
+                        and len(batch) < NotificationDispatcher.MaxEmbedsPerMessage
+                        and characters + len(queue[0]) <= NotificationDispatcher.MaxCharactersPerMessage
+                ):
+                    characters += len(queue[0])
+                    batch.append(queue.popleft())
+                await self._send(self._channels[channel_id], batch)
+        finally:
+            del self._workers[channel_id]
+            del self._queues[channel_id]
+            del self._channels[channel_id]
+
+    async def _send(self, channel: Messageable, embeds: list[Embed]) -> None:
+        error: Exception | None = None
+        for attempt in range(NotificationDispatcher.MaxAttempts):
+            try:
+                async with self._semaphore:
+                    await channel.send(embeds=embeds)
+                Metrics.increment("klaval_notifications_total", len(embeds), result="sent")
+                Metrics.increment("klaval_notification_messages_total")
+                return
+            except (Forbidden, NotFound) as ex:
+                error = ex
+                break  # Retrying will not help. (Missing permissions, deleted channel, ...)
+            except Exception as ex:
+                # Must catch everything. A failed notification must not break the other channels.
+                error = ex
+                if attempt + 1 < NotificationDispatcher.MaxAttempts:
+                    await sleep(NotificationDispatcher.RetryDelay * 2 ** attempt * uniform(.8, 1.2))
+        print(f"Cannot send {len(embeds)} notification(s) to channel {channel.id}: {error}")
+        Metrics.increment("klaval_notifications_total", len(embeds), result="failed")
+
+
+class SharedDispatcher(ABC):
+    __Instance: NotificationDispatcher | None = None
+
+    @staticmethod
+    def get() -> NotificationDispatcher:
+        if SharedDispatcher.__Instance is None:
+            # One dispatcher for all tasks, so that the concurrency limit and channel order apply across tasks.
+            SharedDispatcher.__Instance = NotificationDispatcher()
+        return SharedDispatcher.__Instance
+
+
+def get_dispatcher() -> NotificationDispatcher:
+    return SharedDispatcher.get()
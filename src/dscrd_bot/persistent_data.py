@@ -1,14 +1,27 @@
 from abc import ABC
+from asyncio import Lock as AsyncLock, Task, create_task, sleep, to_thread
 from enum import StrEnum
+from sqlite3 import Connection, connect
 from threading import Lock
 from dataclasses import dataclass
-from json import load, dump
+from json import load, loads, dumps
 from pathlib import Path
 from typing import Final
 
 
 """
-Example persistence file:
+Persistence is stored in an SQLite database. Every mutation marks the rows that it changes (by scope: a server's
+settings and team link, one verified user, one pending verification or the shop offers). A write only serialises and
+commits the marked rows, so its cost does not grow with the number of servers and users.
+
+servers:              id | welcome_channel | embed_author | embed_icon_url
+verified_users:       server_id | user_id (discord) | klavia_id
+team_links:           server_id | tag | notify_events (json list of TeamEvent) | events_channel | has_cached_state
+cached_team_members:  server_id | member_id (klavia) | role (TeamMemberRole)
+shop_offers:          position | name
+pending_verifications: server_id | user_id (discord) | klavia_id | target_car | deadline (unix time)
+
+An existing persistence.json (format below) is migrated once and renamed to persistence.json.migrated afterwards.
 
 {
     "servers": {
@@ -106,80 +119,133 @@ class Server:
     linked_team: TeamLink | None
 
 
+@dataclass
+class PendingVerification:
+    server_id: str
+    user_id: str
+    klavia_id: str
+    target_car: str
+    deadline: float
+
+
 @dataclass
 class PersistentData:
     servers: list[Server]
     shop_offers: list[str]
+    pending_verifications: list[PendingVerification]
+
+
+Row = tuple[str | int | None, ...]
+Rows = dict[str, dict[Row, Row]]  # table -> primary key -> row
+Scope = tuple[str, ...]  # ("server", id) | ("verified_user", server id, user id) | ("pending", ...) | ("shop_offers",)
 
 
 class Persistence(ABC):
     RootDir: Final[Path] = Path(__file__).parent.parent.parent.resolve()
-    PersistenceFile: Final[Path] = RootDir / "persistence.json"
+    PersistenceFile: Final[Path] = RootDir / "persistence.sqlite3"
+    LegacyPersistenceFile: Final[Path] = RootDir / "persistence.json"
     Encoding: Final[str] = "utf-8"
-    Indent: Final[int] = 4
     FileLock: Final[Lock] = Lock()
+    DefaultFlushInterval: Final[float] = 5  # seconds
+
+    # table -> (columns, number of leading columns that form the primary key)
+    Tables: Final[dict[str, tuple[tuple[str, ...], int]]] = {
+        "servers": (("id", "welcome_channel", "embed_author", "embed_icon_url"), 1),
+        "verified_users": (("server_id", "user_id", "klavia_id"), 2),
+        "team_links": (("server_id", "tag", "notify_events", "events_channel", "has_cached_state"), 1),
+        "cached_team_members": (("server_id", "member_id", "role"), 2),
+        "shop_offers": (("position", "name"), 1),
+        "pending_verifications": (("server_id", "user_id", "klavia_id", "target_car", "deadline"), 2)
+    }
+    Schema: Final[str] = """
+        CREATE TABLE IF NOT EXISTS servers (
+            id TEXT PRIMARY KEY,
+            welcome_channel TEXT,
+            embed_author TEXT NOT NULL,
+            embed_icon_url TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS verified_users (
+            server_id TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            klavia_id TEXT NOT NULL,
+            PRIMARY KEY (server_id, user_id)
+        );
+        CREATE TABLE IF NOT EXISTS team_links (
+            server_id TEXT PRIMARY KEY,
+            tag TEXT NOT NULL,
+            notify_events TEXT NOT NULL,
+            events_channel TEXT,
+            has_cached_state INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS cached_team_members (
+            server_id TEXT NOT NULL,
+            member_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            PRIMARY KEY (server_id, member_id)
+        );
+        CREATE TABLE IF NOT EXISTS shop_offers (
+            position INTEGER PRIMARY KEY,
+            name TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS pending_verifications (
+            server_id TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            klavia_id TEXT NOT NULL,
+            target_car TEXT NOT NULL,
+            deadline REAL NOT NULL,
+            PRIMARY KEY (server_id, user_id)
+        );
+    """
+
+    # table -> kind of scope that its rows belong to. (Scopes are the unit of change tracking)
+    TableScopes: Final[dict[str, str]] = {
+        "servers": "server",
+        "verified_users": "verified_user",
+        "team_links": "server",
+        "cached_team_members": "server",
+        "shop_offers": "shop_offers",
+        "pending_verifications": "pending"
+    }
 
     __Instance: PersistentData | None = None
+    __DirtyScopes: set[Scope] = set()  # Changed since the last commit.
+    __Flusher: Task | None = None
+    __FlushLock: AsyncLock | None = None
+    # Indexes into __Instance. Must be kept consistent on every mutation, so only mutate through Persistence:
+    __Servers: dict[str, Server] = {}  # server id -> server
+    __VerifiedUsers: dict[tuple[str, str], User] = {}  # (server id, discord user id) -> user
+    __LinkedUsers: dict[str, dict[tuple[str, str], User]] = {}  # klavia id -> (server id, discord user id) -> user
+    __Pending: dict[tuple[str, str], PendingVerification] = {}  # (server id, discord user id) -> verification
+    __Connection: Connection | None = None
+    __Committed: dict[Scope, Rows] = {}  # Rows as of the last commit by scope. Used to find out what has changed.
 
     @staticmethod
     def get(force_reload: bool = False) -> PersistentData:
-        if not Persistence.PersistenceFile.is_file():
-            Persistence.write()
-
         if not force_reload and Persistence.__Instance is not None:
             return Persistence.__Instance
 
         with Persistence.FileLock:
-            with open(Persistence.PersistenceFile, "r", encoding=Persistence.Encoding) as persistence:
-                per: dict = load(persistence)
-            Persistence.__Instance = PersistentData(
-                servers=[
-                    Server(
-                        id=server[0],
-                        verified_users=[
-                            User(
-                                id=user[0],
-                                klavia_id=user[1]["klavia"]
-                            ) for user in server[1]["verified_users"].items()
-                        ] if "verified_users" in server[1] else [],
-                        welcome_channel=Channel(
-                            id=server[1]["welcome_channel"]
-                        ),
-                        embed_author=server[1]["embed_author"],
-                        embed_icon_url=server[1]["embed_icon_url"],
-                        linked_team=TeamLink(
-                            tag=server[1]["linked_team"]["tag"],
-                            settings=TeamLinkSettings(
-                                notify_events=[
-                                    TeamEvent(e) for e in server[1]["linked_team"]["settings"]["notify_events"]
-                                ]
-                            ),
-                            events_channel=server[1]["linked_team"]["events_channel"],
-                            cached_state=CachedTeamState(
-                                members=[
-                                    CachedTeamMember(
-                                        id=m["id"],
-                                        role=TeamMemberRole(m["role"])
-                                    )
-                                    for m in server[1]["linked_team"]["cached_state"]["members"]
-                                    if "members" in server[1]["linked_team"]["cached_state"]
-                                ]
-                            ) if "cached_state" in server[1]["linked_team"] and
-                                 server[1]["linked_team"]["cached_state"] else None
-                        ) if "linked_team" in server[1] and server[1]["linked_team"] is not None else None
-                    ) for server in per["servers"].items()
-                ],
-                shop_offers=per.get("shop_offers", [])
-            )
+            connection: Connection = Persistence.__connect()
+            rows: Rows = {
+                table: {
+                    row[:key_length]: row
+                    for row in connection.execute(f"SELECT {', '.join(columns)} FROM {table}")
+                } for table, (columns, key_length) in Persistence.Tables.items()
+            }
+            Persistence.__Committed = {}
+            for table, table_rows in rows.items():
+                for key, row in table_rows.items():
+                    scope: Scope = Persistence.__scope_of(table, key)
+                    Persistence.__Committed.setdefault(scope, {}).setdefault(table, {})[key] = row
+            Persistence.__DirtyScopes = set()
+            Persistence.__Instance = Persistence.__from_rows(rows)
+            Persistence.__build_indexes(Persistence.__Instance)
         return Persistence.__Instance
 
     @staticmethod
     def get_server(server_id: str) -> Server:
-        output: Server | None = None
-        for server in Persistence.get().servers:
-            if server.id == server_id:
-                output = server
-                break
+        Persistence.get()  # Makes sure that data and indexes have been loaded.
+        output: Server | None = Persistence.__Servers.get(server_id, None)
         if output is None:
             # Create a new server and write it to persistence:
             output = Server(
@@ -191,64 +257,366 @@ class Persistence(ABC):
                 linked_team=None
             )
             Persistence.__Instance.servers.append(output)
+            Persistence.__Servers[server_id] = output
+            Persistence.mark_server_changed(server_id)
             Persistence.write()
         return output
 
+    @staticmethod
+    def mark_server_changed(server_id: str) -> None:
+        # Call after changing a server's settings, linked team or cached team state, so that the next write has it.
+        Persistence.__DirtyScopes.add(("server", server_id))
+
+    @staticmethod
+    def get_verified_user(server_id: str, user_id: str) -> User | None:
+        Persistence.get()
+        return Persistence.__VerifiedUsers.get((server_id, user_id), None)
+
+    @staticmethod
+    def get_linked_users(klavia_id: str, server_id: str | None = None) -> list[User]:
+        # Reverse lookup: All discord users that are linked to the given Klavia racer. (optionally: on one server only)
+        Persistence.get()
+        return [
+            user for (user_server_id, _), user in Persistence.__LinkedUsers.get(klavia_id, {}).items()
+            if server_id is None or user_server_id == server_id
+        ]
+
+    @staticmethod
+    def add_verified_user(server_id: str, user_id: str, klavia_id: str) -> User:
+        Persistence.remove_verified_user(server_id, user_id)
+        server: Server = Persistence.get_server(server_id)
+        user: User = User(id=user_id, klavia_id=klavia_id)
+        server.verified_users.append(user)
+        Persistence.__VerifiedUsers[(server_id, user_id)] = user
+        Persistence.__LinkedUsers.setdefault(klavia_id, {})[(server_id, user_id)] = user
+        Persistence.__DirtyScopes.add(("verified_user", server_id, user_id))
+        return user
+
+    @staticmethod
+    def remove_verified_user(server_id: str, user_id: str) -> bool:
+        user: User | None = Persistence.get_verified_user(server_id, user_id)
+        if user is None:
+            return False
+        server: Server = Persistence.get_server(server_id)
+        server.verified_users = [u for u in server.verified_users if u.id != user_id]
+        del Persistence.__VerifiedUsers[(server_id, user_id)]
+        linked: dict[tuple[str, str], User] = Persistence.__LinkedUsers.get(user.klavia_id, {})
+        linked.pop((server_id, user_id), None)
+        if not linked:
+            Persistence.__LinkedUsers.pop(user.klavia_id, None)
+        Persistence.__DirtyScopes.add(("verified_user", server_id, user_id))
+        return True
+
+    @staticmethod
+    def add_pending_verification(pending: PendingVerification) -> None:
+        Persistence.remove_pending_verification(pending.server_id, pending.user_id)
+        Persistence.get().pending_verifications.append(pending)
+        Persistence.__Pending[(pending.server_id, pending.user_id)] = pending
+        Persistence.__DirtyScopes.add(("pending", pending.server_id, pending.user_id))
+
+    @staticmethod
+    def remove_pending_verification(server_id: str, user_id: str) -> None:
+        data: PersistentData = Persistence.get()
+        pending: PendingVerification | None = Persistence.__Pending.pop((server_id, user_id), None)
+        if pending is not None:
+            data.pending_verifications.remove(pending)
+            Persistence.__DirtyScopes.add(("pending", server_id, user_id))
+
+    @staticmethod
+    def set_shop_offers(shop_offers: list[str]) -> None:
+        Persistence.get().shop_offers = shop_offers
+        Persistence.__DirtyScopes.add(("shop_offers",))
+
     @staticmethod
     def write() -> None:
+        if Persistence.__Flusher is not None and not Persistence.__Flusher.done():
+            # Write-behind mode: The flusher coalesces all marked changes into one commit per interval.
+            return
+        Persistence.flush_now()
+
+    @staticmethod
+    async def flush() -> None:
+        # Durable write for critical paths. Diffing and disk I/O run in a worker thread, off the event loop.
+        if Persistence.__FlushLock is None:
+            Persistence.__FlushLock = AsyncLock()
+        async with Persistence.__FlushLock:  # Keeps commits in order. An older snapshot must never win.
+            # The snapshot must be taken on the event loop, because commands mutate the data there.
+            # It only covers the changed scopes, so it stays small no matter how many users are stored.
+            snapshot: dict[Scope, Rows] = Persistence.__take_dirty()
+            if not snapshot:
+                return
+            try:
+                await to_thread(Persistence.__commit, snapshot)
+            except Exception:
+                Persistence.__DirtyScopes.update(snapshot)
+                raise
+
+    @staticmethod
+    def flush_now() -> None:
+        # Blocking write. Only use this, if there is no event loop. (e.g. on shutdown or in scripts)
+        snapshot: dict[Scope, Rows] = Persistence.__take_dirty()
+        if not snapshot:
+            return
+        try:
+            Persistence.__commit(snapshot)
+        except Exception:
+            Persistence.__DirtyScopes.update(snapshot)
+            raise
+
+    @staticmethod
+    def start_write_behind(interval: float = DefaultFlushInterval) -> None:
+        if Persistence.__Flusher is not None and not Persistence.__Flusher.done():
+            return  # Already running. (on_ready is triggered again after every reconnect)
+
+        async def flush_periodically() -> None:
+            while True:
+                await sleep(interval)
+                if Persistence.__DirtyScopes:
+                    try:
+                        await Persistence.flush()
+                    except Exception as ex:
+                        # Keep it running. Changes stay dirty and are retried with the next flush.
+                        print("Cannot flush persistence: ", ex)
+
+        Persistence.__Flusher = create_task(flush_periodically())
+
+    @staticmethod
+    def __take_dirty() -> dict[Scope, Rows]:
+        # Current rows of every changed scope. Resets the changes.
+        Persistence.get()
+        snapshot: dict[Scope, Rows] = {scope: Persistence.__scope_rows(scope) for scope in Persistence.__DirtyScopes}
+        Persistence.__DirtyScopes = set()
+        return snapshot
+
+    @staticmethod
+    def __commit(snapshot: dict[Scope, Rows]) -> None:
         with Persistence.FileLock:
-            with open(Persistence.PersistenceFile, "w", encoding=Persistence.Encoding) as persistence:
-                if Persistence.__Instance is None:
-                    dump(
-                        {
-                            "servers": {
+            deleted: dict[str, list[Row]] = {table: [] for table in Persistence.Tables}
+            changed: dict[str, list[Row]] = {table: [] for table in Persistence.Tables}
+            for scope, rows in snapshot.items():
+                committed: Rows = Persistence.__Committed.get(scope, {})
+                for table in Persistence.Tables:
+                    committed_rows: dict[Row, Row] = committed.get(table, {})
+                    current: dict[Row, Row] = rows.get(table, {})
+                    deleted[table] += [key for key in committed_rows if key not in current]
+                    changed[table] += [row for key, row in current.items() if committed_rows.get(key, None) != row]
+
+            connection: Connection = Persistence.__connect()
+            with connection:  # One transaction: Either everything is committed or nothing.
+                for table, (columns, key_length) in Persistence.Tables.items():
+                    if deleted[table]:
+                        connection.executemany(
+                            f"DELETE FROM {table} WHERE {' AND '.join(f'{c} = ?' for c in columns[:key_length])}",
+                            deleted[table]
+                        )
+                    if changed[table]:
+                        connection.executemany(
+                            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) "
+                            f"VALUES ({', '.join('?' for _ in columns)})",
+                            changed[table]
+                        )
+            for scope, rows in snapshot.items():
+                if any(rows.values()):
+                    Persistence.__Committed[scope] = rows
+                else:
+                    Persistence.__Committed.pop(scope, None)
 
-                            },
-                            "shop_offers": [
+    @staticmethod
+    def __connect() -> Connection:
+        if Persistence.__Connection is None:
+            migrate: bool = not Persistence.PersistenceFile.is_file() and Persistence.LegacyPersistenceFile.is_file()
+            # Commits may happen in worker threads. The FileLock makes sure that only one thread uses the connection.
+            connection: Connection = connect(Persistence.PersistenceFile, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")  # Atomic, crash safe commits without rewriting the file.
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(Persistence.Schema)
+            Persistence.__Connection = connection
+            if migrate:
+                Persistence.__migrate_legacy_file(connection)
+        return Persistence.__Connection
 
+    @staticmethod
+    def __migrate_legacy_file(connection: Connection) -> None:
+        with open(Persistence.LegacyPersistenceFile, "r", encoding=Persistence.Encoding) as persistence:
+            per: dict = load(persistence)
+        data: PersistentData = PersistentData(
+            servers=[
+                Server(
+                    id=server[0],
+                    verified_users=[
+                        User(
+                            id=user[0],
+                            klavia_id=user[1]["klavia"]
+                        ) for user in server[1]["verified_users"].items()
+                    ] if "verified_users" in server[1] else [],
+                    welcome_channel=Channel(
+                        id=server[1]["welcome_channel"]
+                    ) if server[1].get("welcome_channel", None) is not None else None,
+                    embed_author=server[1]["embed_author"],
+                    embed_icon_url=server[1]["embed_icon_url"],
+                    linked_team=TeamLink(
+                        tag=server[1]["linked_team"]["tag"],
+                        settings=TeamLinkSettings(
+                            notify_events=[
+                                TeamEvent(e) for e in server[1]["linked_team"]["settings"]["notify_events"]
                             ]
-                        },
-                        persistence,
-                        indent=Persistence.Indent
-                    )
-                else:
-                    dump(
-                        {
-                            "servers": {
-                                server.id: {
-                                    "verified_users": {
-                                        user.id: {
-                                            "klavia": user.klavia_id
-                                        }
-                                        for user in server.verified_users
-                                    },
-                                    "welcome_channel": server.welcome_channel.id if server.welcome_channel else None,
-                                    "embed_author": server.embed_author,
-                                    "embed_icon_url": server.embed_icon_url,
-                                    "linked_team": {
-                                        "tag": server.linked_team.tag,
-                                        "settings": {
-                                            "notify_events": [
-                                                str(e) for e in server.linked_team.settings.notify_events
-                                            ]
-                                        },
-                                        "events_channel": server.linked_team.events_channel,
-                                        "cached_state": {
-                                            "members": [
-                                                {
-                                                    "id": m.id,
-                                                    "role": str(m.role)
-                                                }
-                                                for m in server.linked_team.cached_state.members
-                                            ]
-                                        } if server.linked_team.cached_state else None
-                                    } if server.linked_team else None
-                                }
-                                for server in Persistence.__Instance.servers
-                            },
-                            "shop_offers": Persistence.__Instance.shop_offers
-                        },
-                        persistence,
-                        indent=Persistence.Indent
-                    )
-        Persistence.get(force_reload=True)
+                        ),
+                        events_channel=server[1]["linked_team"]["events_channel"],
+                        cached_state=CachedTeamState(
+                            members=[
+                                CachedTeamMember(
+                                    id=m["id"],
+                                    role=TeamMemberRole(m["role"])
+                                )
+                                for m in server[1]["linked_team"]["cached_state"].get("members", [])
+                            ]
+                        ) if server[1]["linked_team"].get("cached_state", None) else None
+                    ) if server[1].get("linked_team", None) is not None else None
+                ) for server in per["servers"].items()
+            ],
+            shop_offers=per.get("shop_offers", []),
+            pending_verifications=[]
+        )
+        rows: Rows = Persistence.__to_rows(data)
+        with connection:
+            for table, (columns, _) in Persistence.Tables.items():
+                connection.executemany(
+                    f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                    rows[table].values()
+                )
+        Persistence.LegacyPersistenceFile.rename(
+            Persistence.LegacyPersistenceFile.with_suffix(Persistence.LegacyPersistenceFile.suffix + ".migrated")
+        )
+        print(f"Migrated {len(data.servers)} servers from {Persistence.LegacyPersistenceFile.name}.")
+
+    @staticmethod
+    def __build_indexes(data: PersistentData) -> None:
+        Persistence.__Servers = {server.id: server for server in data.servers}
+        Persistence.__VerifiedUsers = {
+            (server.id, user.id): user for server in data.servers for user in server.verified_users
+        }
+        Persistence.__LinkedUsers = {}
+        for (server_id, user_id), user in Persistence.__VerifiedUsers.items():
+            Persistence.__LinkedUsers.setdefault(user.klavia_id, {})[(server_id, user_id)] = user
+        Persistence.__Pending = {(p.server_id, p.user_id): p for p in data.pending_verifications}
+
+    @staticmethod
+    def __scope_of(table: str, key: Row) -> Scope:
+        kind: str = Persistence.TableScopes[table]
+        if kind == "server":
+            return kind, key[0]
+        if kind == "shop_offers":
+            return kind,
+        return kind, key[0], key[1]
+
+    @staticmethod
+    def __scope_rows(scope: Scope) -> Rows:
+        # Current rows of one scope. Empty, if it has been removed.
+        rows: Rows = {}
+        match scope:
+            case ("server", server_id):
+                server: Server | None = Persistence.__Servers.get(server_id, None)
+                if server is not None:
+                    Persistence.__add_server_rows(rows, server)
+            case ("verified_user", server_id, user_id):
+                user: User | None = Persistence.__VerifiedUsers.get((server_id, user_id), None)
+                if user is not None:
+                    rows["verified_users"] = {(server_id, user_id): (server_id, user_id, user.klavia_id)}
+            case ("pending", server_id, user_id):
+                pending: PendingVerification | None = Persistence.__Pending.get((server_id, user_id), None)
+                if pending is not None:
+                    Persistence.__add_pending_row(rows, pending)
+            case ("shop_offers",):
+                Persistence.__add_shop_offer_rows(rows, Persistence.__Instance.shop_offers)
+        return rows
+
+    @staticmethod
+    def __to_rows(data: PersistentData) -> Rows:
+        # All rows at once. Only used for the migration. Writes go through the changed scopes instead.
+        rows: Rows = {table: {} for table in Persistence.Tables}
+        for server in data.servers:
+            Persistence.__add_server_rows(rows, server)
+            for user in server.verified_users:
+                rows["verified_users"][(server.id, user.id)] = (server.id, user.id, user.klavia_id)
+        Persistence.__add_shop_offer_rows(rows, data.shop_offers)
+        for p in data.pending_verifications:
+            Persistence.__add_pending_row(rows, p)
+        return rows
+
+    @staticmethod
+    def __add_server_rows(rows: Rows, server: Server) -> None:
+        # Everything of the server but its verified users. (They are scopes of their own)
+        rows.setdefault("servers", {})[(server.id,)] = (
+            server.id,
+            server.welcome_channel.id if server.welcome_channel else None,
+            server.embed_author,
+            server.embed_icon_url
+        )
+        if server.linked_team:
+            rows.setdefault("team_links", {})[(server.id,)] = (
+                server.id,
+                server.linked_team.tag,
+                dumps([str(e) for e in server.linked_team.settings.notify_events]),
+                server.linked_team.events_channel,
+                int(server.linked_team.cached_state is not None)
+            )
+            if server.linked_team.cached_state:
+                for m in server.linked_team.cached_state.members:
+                    rows.setdefault("cached_team_members", {})[(server.id, m.id)] = (server.id, m.id, str(m.role))
+
+    @staticmethod
+    def __add_shop_offer_rows(rows: Rows, shop_offers: list[str]) -> None:
+        for position, name in enumerate(shop_offers):
+            rows.setdefault("shop_offers", {})[(position,)] = (position, name)
+
+    @staticmethod
+    def __add_pending_row(rows: Rows, p: PendingVerification) -> None:
+        rows.setdefault("pending_verifications", {})[(p.server_id, p.user_id)] = (
+            p.server_id, p.user_id, p.klavia_id, p.target_car, p.deadline
+        )
+
+    @staticmethod
+    def __from_rows(rows: Rows) -> PersistentData:
+        verified_users: dict[str, list[User]] = {}
+        for server_id, user_id, klavia_id in rows["verified_users"].values():
+            verified_users.setdefault(server_id, []).append(User(id=user_id, klavia_id=klavia_id))
+
+        cached_members: dict[str, list[CachedTeamMember]] = {}
+        for server_id, member_id, role in rows["cached_team_members"].values():
+            cached_members.setdefault(server_id, []).append(CachedTeamMember(id=member_id, role=TeamMemberRole(role)))
+
+        team_links: dict[str, TeamLink] = {
+            server_id: TeamLink(
+                tag=tag,
+                settings=TeamLinkSettings(
+                    notify_events=[TeamEvent(e) for e in loads(notify_events)]
+                ),
+                events_channel=events_channel,
+                cached_state=CachedTeamState(
+                    members=cached_members.get(server_id, [])
+                ) if has_cached_state else None
+            ) for server_id, tag, notify_events, events_channel, has_cached_state in rows["team_links"].values()
+        }
+
+        return PersistentData(
+            servers=[
+                Server(
+                    id=server_id,
+                    verified_users=verified_users.get(server_id, []),
+                    welcome_channel=Channel(id=welcome_channel) if welcome_channel is not None else None,
+                    embed_author=embed_author,
+                    embed_icon_url=embed_icon_url,
+                    linked_team=team_links.get(server_id, None)
+                ) for server_id, welcome_channel, embed_author, embed_icon_url in rows["servers"].values()
+            ],
+            shop_offers=[name for _, name in sorted(rows["shop_offers"].values())],
+            pending_verifications=[
+                PendingVerification(
+                    server_id=server_id,
+                    user_id=user_id,
+                    klavia_id=klavia_id,
+                    target_car=target_car,
+                    deadline=deadline
+                ) for server_id, user_id, klavia_id, target_car, deadline in rows["pending_verifications"].values()
+            ]
+        )
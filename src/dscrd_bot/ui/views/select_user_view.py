@@ -20,7 +20,7 @@ class SelectUserView(View):
         self._select: SelectWithCallback = SelectWithCallback(
             options=[
                 SelectOption(
-                    label=f"{identity.id} - {identity.display_name} - {identity.username}",
+                    label=f"{identity.id} - {identity.display_name} - {identity.username or '-'}",
                     value=identity.id
                 ) for identity in users
             ],
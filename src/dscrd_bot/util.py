@@ -1,3 +1,5 @@
+from abc import ABC
+from math import ceil
 from pathlib import Path
 from typing import Any, Final
 
@@ -6,9 +8,12 @@ from discord.ext.commands import Context, MissingPermissions, CommandError
 from discord.utils import get
 from dotenv import dotenv_values
 
-from crawler import Crawler, UserIdentity
+from crawler import AsyncCrawler, UserIdentity
+from klavia.car_catalogue import CarCatalogue
+from klavia.parsers import HtmlParser
+from klavia.transport import CircuitBreaker, SharedTransport
 from dscrd_bot.embeds import ErrorEmbed, ErrorType
-from dscrd_bot.persistent_data import Persistence, Server
+from dscrd_bot.persistent_data import Persistence, Server, User
 from dscrd_bot.roles import HeBotRole
 
 
@@ -23,8 +28,35 @@ RootDir: Path = Path(__file__).parent.parent.parent.resolve()
 EnvVars: Final[dict[str, str]] = dotenv_values(RootDir / ".env")
 
 
-def get_crawler() -> Crawler:
-    return Crawler(EnvVars["klavia_username_or_mail"], EnvVars["klavia_password"])
+class SharedCrawler(ABC):
+    __Instance: AsyncCrawler | None = None
+
+    @staticmethod
+    def get() -> AsyncCrawler:
+        if SharedCrawler.__Instance is None:
+            # One process-wide crawler, so that all commands and tasks share the same login and connection pool.
+            HtmlParser.use(
+                EnvVars.get("html_parser") or None,
+                (EnvVars.get("html_parser_partial") or "false").lower() == "true"
+            )
+            SharedTransport.configure(
+                float(EnvVars.get("klavia_requests_per_second") or SharedTransport.RequestsPerSecond)
+            )
+            SharedCrawler.__Instance = AsyncCrawler(
+                EnvVars["klavia_username_or_mail"],
+                EnvVars["klavia_password"],
+                car_catalogue_ttl=float(EnvVars.get("car_catalogue_ttl") or CarCatalogue.DefaultTtl)
+            )
+        return SharedCrawler.__Instance
+
+    @staticmethod
+    def use(crawler: AsyncCrawler) -> None:
+        # Replaces the shared crawler. (e.g. with one that talks to a fake Klavia server)
+        SharedCrawler.__Instance = crawler
+
+
+def get_crawler() -> AsyncCrawler:
+    return SharedCrawler.get()
 
 
 def is_verified(discord_user: Member) -> bool:
@@ -33,10 +65,13 @@ def is_verified(discord_user: Member) -> bool:
 
 
 def get_klava_id(verified_discord_user: Member) -> str:
-    for verified_user in Persistence.get_server(str(verified_discord_user.guild.id)).verified_users:
-        if verified_user.id == str(verified_discord_user.id):
-            return verified_user.klavia_id
-    raise Exception("Cannot find Klavia ID")
+    verified_user: User | None = Persistence.get_verified_user(
+        str(verified_discord_user.guild.id),
+        str(verified_discord_user.id)
+    )
+    if verified_user is None:
+        raise Exception("Cannot find Klavia ID")
+    return verified_user.klavia_id
 
 
 async def error_handler(ctx: Context, error: CommandError) -> Any:
@@ -75,8 +110,30 @@ async def verification_check_passed(ctx: Context, respond: bool = True) -> bool:
     return verified
 
 
+async def klavia_check_passed(ctx: Context, respond: bool = True) -> bool:
+    # Fails fast while the circuit breaker considers Klavia to be down.
+    circuit_breaker: CircuitBreaker = get_crawler().session.circuit_breaker
+    available: bool = not circuit_breaker.is_open
+    if not available and respond:
+        server: Server = Persistence.get_server(str(ctx.guild.id))
+        await ctx.respond(
+            embed=ErrorEmbed(
+                error_type=ErrorType.Unavailable,
+                source=ctx.command.name,
+                reason=(
+                    f"{ctx.author.mention} Klavia is not reachable right now. "
+                    f"Please try again in {ceil(circuit_breaker.retry_in)} seconds."
+                ),
+                custom_title=server.embed_author,
+                author_icon_url=server.embed_icon_url
+            ),
+            ephemeral=True
+        )
+    return available
+
+
 async def get_identity(ctx: Context, klavia_name: str) -> UserIdentity | None:
-    racer: UserIdentity | None = get_crawler().search_racer(klavia_name)
+    racer: UserIdentity | None = await get_crawler().search_racer(klavia_name)
     if racer is None:
         server: Server = Persistence.get_server(str(ctx.guild.id))
         await ctx.respond(
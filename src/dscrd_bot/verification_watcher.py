@@ -0,0 +1,206 @@
+from abc import ABC
+from asyncio import Event, Semaphore, Task, TimeoutError, create_task, gather, wait_for
+from dataclasses import dataclass
+from random import uniform
+from time import time
+from typing import Final
+
+from discord import Bot, Embed, Guild, Interaction, Member, Role
+from discord.utils import get
+
+from crawler import Car
+from dscrd_bot.commands.sync import sync
+from dscrd_bot.embeds import OkayEmbed, ErrorEmbed, ErrorType
+from dscrd_bot.persistent_data import Persistence, PendingVerification, Server
+from dscrd_bot.roles import HeBotRole
+from dscrd_bot.util import get_crawler
+
+
+@dataclass
+class Challenge:
+    pending: PendingVerification
+    interaction: Interaction | None  # None, if the challenge has been restored after a restart.
+    interval: float
+    next_check_at: float
+
+
+class VerificationWatcher(ABC):
+    # Owns all pending verifications and polls them in batched rounds, instead of one polling loop per user.
+    InitialInterval: Final[float] = 10  # First check shortly after the user has been prompted.
+    MaxInterval: Final[float] = 60
+    Backoff: Final[float] = 1.5  # Interval grows by this factor after every unsuccessful check.
+    Jitter: Final[float] = .2  # +- 20 %, so that challenges started together do not stay in lockstep.
+    BatchWindow: Final[float] = 3  # Challenges that are due within this window are checked in the same round.
+    Timeout: Final[float] = 60 * 5
+    Concurrency: Final[int] = 4
+
+    __Bot: Bot | None = None
+    __Challenges: dict[tuple[str, str], Challenge] = {}  # (server id, discord user id) -> challenge
+    __Wakeup: Event | None = None
+    __Task: Task | None = None
+
+    @staticmethod
+    def start(bot: Bot) -> None:
+        # Restores the challenges that were pending when the bot stopped.
+        VerificationWatcher.__Bot = bot
+        for pending in Persistence.get().pending_verifications:
+            key: tuple[str, str] = (pending.server_id, pending.user_id)
+            if key not in VerificationWatcher.__Challenges:
+                VerificationWatcher.__Challenges[key] = Challenge(
+                    pending=pending,
+                    interaction=None,
+                    interval=VerificationWatcher.InitialInterval,
+                    next_check_at=time()
+                )
+        VerificationWatcher.__ensure_running()
+
+    @staticmethod
+    async def watch(interaction: Interaction, klavia_id: str, target_car: Car) -> None:
+        pending: PendingVerification = PendingVerification(
+            server_id=str(interaction.guild.id),
+            user_id=str(interaction.user.id),
+            klavia_id=klavia_id,
+            target_car=target_car.name,
+            deadline=time() + VerificationWatcher.Timeout
+        )
+        Persistence.add_pending_verification(pending)
+        await Persistence.flush()
+        VerificationWatcher.__Challenges[(pending.server_id, pending.user_id)] = Challenge(
+            pending=pending,
+            interaction=interaction,
+            interval=VerificationWatcher.InitialInterval,
+            next_check_at=time() + VerificationWatcher.InitialInterval
+        )
+        VerificationWatcher.__ensure_running()
+        VerificationWatcher.__Wakeup.set()
+
+    @staticmethod
+    def __ensure_running() -> None:
+        if VerificationWatcher.__Wakeup is None:
+            VerificationWatcher.__Wakeup = Event()
+        if VerificationWatcher.__Task is None or VerificationWatcher.__Task.done():
+            VerificationWatcher.__Task = create_task(VerificationWatcher.__run())
+
+    @staticmethod
+    async def __run() -> None:
+        while VerificationWatcher.__Challenges:
+            next_check_at: float = min(c.next_check_at for c in VerificationWatcher.__Challenges.values())
+            VerificationWatcher.__Wakeup.clear()
+            try:
+                # Sleep until the next challenge is due, or until a new challenge has been added.
+                await wait_for(VerificationWatcher.__Wakeup.wait(), timeout=max(0.0, next_check_at - time()))
+                continue
+            except TimeoutError:
+                pass
+
+            now: float = time()
+            due: list[Challenge] = [
+                c for c in VerificationWatcher.__Challenges.values()
+                if c.next_check_at <= now + VerificationWatcher.BatchWindow
+            ]
+            semaphore: Semaphore = Semaphore(VerificationWatcher.Concurrency)
+
+            async def check(challenge: Challenge) -> None:
+                async with semaphore:
+                    try:
+                        await VerificationWatcher.__check(challenge)
+                    except Exception as ex:
+                        # Must catch everything, so that one challenge does not break all others.
+                        print(f"Cannot check verification of user {challenge.pending.user_id}: {ex}")
+                        key: tuple[str, str] = (challenge.pending.server_id, challenge.pending.user_id)
+                        if VerificationWatcher.__Challenges.get(key, None) is not challenge:
+                            return  # Already finished. (The error happened while finishing it)
+                        try:
+                            await VerificationWatcher.__reschedule(challenge)
+                        except Exception as finish_error:
+                            print(f"Cannot finish verification of user {challenge.pending.user_id}: {finish_error}")
+
+            await gather(*[check(c) for c in due])
+
+    @staticmethod
+    async def __check(challenge: Challenge) -> None:
+        car: Car = (await get_crawler().get_garage(challenge.pending.klavia_id, fresh=True)).selected_car
+        if car.name == challenge.pending.target_car:
+            await VerificationWatcher.__finish(challenge, verified=True)
+        else:
+            await VerificationWatcher.__reschedule(challenge)
+
+    @staticmethod
+    async def __reschedule(challenge: Challenge) -> None:
+        # Also called after failed checks. Once the deadline has passed, the challenge times out instead of being
+        # checked again, whether the last check succeeded or not.
+        now: float = time()
+        if now >= challenge.pending.deadline:
+            await VerificationWatcher.__finish(challenge, verified=False)
+            return
+        challenge.interval = min(challenge.interval * VerificationWatcher.Backoff, VerificationWatcher.MaxInterval)
+        jitter: float = uniform(-VerificationWatcher.Jitter, VerificationWatcher.Jitter)
+        # Never check later than the deadline. (Still in the future, see above)
+        challenge.next_check_at = min(now + challenge.interval * (1 + jitter), challenge.pending.deadline)
+
+    @staticmethod
+    async def __finish(challenge: Challenge, verified: bool) -> None:
+        pending: PendingVerification = challenge.pending
+        del VerificationWatcher.__Challenges[(pending.server_id, pending.user_id)]
+        Persistence.remove_pending_verification(pending.server_id, pending.user_id)
+        if verified:
+            Persistence.add_verified_user(pending.server_id, pending.user_id, pending.klavia_id)
+        await Persistence.flush()
+
+        member: Member | None = await VerificationWatcher.__get_member(challenge)
+        if member is None:
+            return  # Member has left the server in the meantime.
+        server: Server = Persistence.get_server(pending.server_id)
+        role_verified: Role = get(member.guild.roles, name=str(HeBotRole.Verified))
+        role_unverified: Role = get(member.guild.roles, name=str(HeBotRole.Unverified))
+        role_pending: Role = get(member.guild.roles, name=str(HeBotRole.VerificationPending))
+
+        response: Embed
+        if verified:
+            await member.remove_roles(role_unverified)
+            await member.add_roles(role_verified)
+            await member.remove_roles(role_pending)
+            await sync(member)
+            response = OkayEmbed(
+                title="Verified",
+                description=(
+                    f"{member.mention} "
+                    f"You have been verified. You may now change your selected car to whatever you like."
+                ),
+                custom_title=server.embed_author,
+                author_icon_url=server.embed_icon_url
+            )
+        else:
+            await member.remove_roles(role_pending)
+            response = ErrorEmbed(
+                error_type=ErrorType.Timeout,
+                source=challenge.interaction.data.get("name") if challenge.interaction else "verify",
+                reason=(
+                    f"{member.mention}"
+                    f"Cannot verify your account.\n"
+                    f"Please try again later."
+                ),
+                custom_title=server.embed_author,
+                author_icon_url=server.embed_icon_url
+            )
+
+        if challenge.interaction is not None:
+            await challenge.interaction.respond(embed=response, ephemeral=True)
+        else:
+            # The interaction is gone after a restart -> Send a direct message instead.
+            await member.send(embed=response)
+
+    @staticmethod
+    async def __get_member(challenge: Challenge) -> Member | None:
+        if challenge.interaction is not None:
+            return challenge.interaction.user
+        guild: Guild | None = VerificationWatcher.__Bot.get_guild(int(challenge.pending.server_id))
+        if guild is None:
+            return None
+        member: Member | None = guild.get_member(int(challenge.pending.user_id))
+        if member is None:
+            try:
+                member = await guild.fetch_member(int(challenge.pending.user_id))
+            except Exception:
+                return None  # Not a member anymore.
+        return member
@@ -0,0 +1,58 @@
+from asyncio import Lock, Task, create_task
+from time import monotonic
+from typing import Awaitable, Callable, Final, Iterable
+
+from klavia.models import Car
+
+
+class CarCatalogue:
+    DefaultTtl: Final[float] = 60 * 60 * 6  # New cars are only added with Klavia updates.
+    MinRefreshInterval: Final[float] = 60  # Unknown car names trigger a refresh at most this often.
+
+    def __init__(self, fetch: Callable[[], Awaitable[dict[str, Car]]], ttl: float = DefaultTtl) -> None:
+        self._fetch: Callable[[], Awaitable[dict[str, Car]]] = fetch
+        self._ttl: float = ttl
+        self._cars: dict[str, Car] = {}
+        self._fetched_at: float = 0
+        self._fetch_count: int = 0
+        self._lock: Lock = Lock()
+        self._background_refresh: Task | None = None
+
+    @property
+    def fetch_count(self) -> int:
+        return self._fetch_count
+
+    async def get(self) -> dict[str, Car]:
+        if not self._cars:
+            await self.refresh()
+        elif monotonic() - self._fetched_at > self._ttl:
+            # Serve the stale catalogue and refresh it in the background:
+            if self._background_refresh is None or self._background_refresh.done():
+                self._background_refresh = create_task(self.refresh())
+                self._background_refresh.add_done_callback(self._on_background_refresh)
+        return self._cars
+
+    async def get_including(self, names: Iterable[str]) -> dict[str, Car]:
+        cars: dict[str, Car] = await self.get()
+        unknown_car: bool = any(name not in cars for name in names)
+        if unknown_car and monotonic() - self._fetched_at > CarCatalogue.MinRefreshInterval:
+            cars = await self.refresh()
+        return cars
+
+    async def refresh(self) -> dict[str, Car]:
+        requested_at: float = monotonic()
+        async with self._lock:
+            if self._fetched_at >= requested_at:
+                return self._cars  # Someone else has refreshed the catalogue while we were waiting.
+            cars: dict[str, Car] = await self._fetch()
+            self._fetch_count += 1
+            if cars:
+                self._cars = cars
+                self._fetched_at = monotonic()
+        return self._cars
+
+    @staticmethod
+    def _on_background_refresh(task: Task) -> None:
+        # Nobody awaits the background refresh. The stale catalogue is kept and the next get() tries again.
+        if not task.cancelled() and task.exception() is not None:
+            print("Cannot refresh car catalogue: ", task.exception())
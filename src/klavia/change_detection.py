@@ -0,0 +1,79 @@
+from dataclasses import dataclass
+from hashlib import sha256
+from re import Pattern, compile
+from typing import Any, Awaitable, Callable, Final, TypeVar
+
+from klavia.metrics import Metrics
+from klavia.session import KlaviaSession, KlaviaResponse
+
+
+T = TypeVar("T")
+
+
+# Parts of a page that change on every request, without the page's content having changed:
+VolatileParts: Final[Pattern[str]] = compile(
+    r'<meta name="csrf-(?:token|param)" content="[^"]*"|name="authenticity_token" value="[^"]*"|nonce="[^"]*"'
+)
+
+
+def fingerprint(html: str) -> str:
+    return sha256(VolatileParts.sub("", html).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class PageVersion:
+    fingerprint: str
+    etag: str | None
+    last_modified: str | None
+    parsed: Any
+
+
+class ChangeDetector:
+    # Remembers the last version of every watched page. Unchanged pages are neither downloaded again (if Klavia
+    # answers conditional requests) nor parsed again. Instead, the previously parsed result is returned.
+    # Whether a page has changed is decided by its parsed content, not by its markup: Pages like the team page
+    # contain columns (last race, team races) that change all the time, even though nothing relevant has.
+
+    def __init__(self) -> None:
+        self._pages: dict[str, PageVersion] = {}
+
+    async def get(
+            self,
+            session: KlaviaSession,
+            url: str,
+            parse: Callable[[str], Awaitable[T]],
+            fresh: bool = False,
+            relevant: Callable[[T], Any] = lambda parsed: parsed
+    ) -> tuple[T, bool]:
+        # Returns the parsed page and whether it has changed since the last call.
+        # fresh: Download and parse the page, even if it has not changed. (Still reports whether it has)
+        # relevant: The part of the parsed page that callers act on. The page has only changed, if this has.
+        known: PageVersion | None = self._pages.get(url, None)
+        headers: dict[str, str] = {}
+        if known is not None and known.etag and not fresh:
+            headers["If-None-Match"] = known.etag
+        if known is not None and known.last_modified and not fresh:
+            headers["If-Modified-Since"] = known.last_modified
+
+        response: KlaviaResponse = await session.get(url, headers)
+        if known is not None and response.status == 304:
+            Metrics.increment("klavia_page_changes_total", result="not_modified")
+            return known.parsed, False
+
+        page_fingerprint: str = fingerprint(response.text)
+        if known is not None and page_fingerprint == known.fingerprint and not fresh:
+            Metrics.increment("klavia_page_changes_total", result="unchanged")
+            known.etag = response.headers.get("ETag", None)
+            known.last_modified = response.headers.get("Last-Modified", None)
+            return known.parsed, False
+
+        parsed: T = await parse(response.text)
+        self._pages[url] = PageVersion(
+            fingerprint=page_fingerprint,
+            etag=response.headers.get("ETag", None),
+            last_modified=response.headers.get("Last-Modified", None),
+            parsed=parsed
+        )
+        changed: bool = known is None or relevant(parsed) != relevant(known.parsed)
+        Metrics.increment("klavia_page_changes_total", result="changed" if changed else "unchanged")
+        return parsed, changed
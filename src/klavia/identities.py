@@ -0,0 +1,175 @@
+from collections import Counter
+from heapq import nlargest
+from time import monotonic
+from typing import Final, Iterable
+
+from klavia.models import UserIdentity
+
+
+def normalise(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def trigrams(text: str) -> set[str]:
+    # Padded, so that short queries and word beginnings still produce grams: "hen" -> "  h", " he", "hen", "en "
+    padded: str = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def field_similarity(query: str, query_grams: set[str], field: str) -> float:
+    # 0..1 - Exact > prefix > substring > trigram overlap. Both texts must be normalised.
+    if not field:
+        return 0
+    if field == query:
+        return 1
+    if field.startswith(query):
+        return .8 + .15 * len(query) / len(field)
+    if query in field:
+        return .6 + .15 * len(query) / len(field)
+    field_grams: set[str] = trigrams(field)
+    return .6 * 2 * len(query_grams & field_grams) / (len(query_grams) + len(field_grams))  # Dice coefficient
+
+
+def matches(query: str, identity: UserIdentity) -> bool:
+    # Whether Klavia's search would return the racer for the (normalised) query: Its id, or a part of a name.
+    return (
+        query == identity.id
+        or query in normalise(identity.username)
+        or query in normalise(identity.display_name)
+    )
+
+
+def similarity(query: str, identity: UserIdentity) -> float:
+    # Best match over username and display name. (Users often search for one while thinking of the other)
+    query = normalise(query)
+    if query == identity.id:
+        return 1
+    query_grams: set[str] = trigrams(query)
+    return max(
+        field_similarity(query, query_grams, normalise(identity.username)),
+        field_similarity(query, query_grams, normalise(identity.display_name))
+    )
+
+
+class IdentityCache:
+    # In-memory index of all racers seen so far. (Searches, team lookups, verifications)
+    # Serves id lookups and fuzzy name searches without asking Klavia.
+    # Profile headers have no usernames. Such identities have username "", until a Klavia search returns the racer.
+    # So find() only matches them by id.
+    DefaultTtl: Final[float] = 60 * 60 * 12  # Display names rarely change. Twelve hours is recent enough.
+    DefaultMaxSize: Final[int] = 20000  # The least recently updated identities are dropped beyond this.
+    MinSimilarity: Final[float] = .2  # Weaker fuzzy matches are noise.
+    MinSharedGrams: Final[float] = .3  # Candidates must share this fraction of the query's trigrams. (At least one)
+
+    def __init__(self, ttl: float = DefaultTtl, max_size: int = DefaultMaxSize) -> None:
+        self._ttl: float = ttl
+        self._max_size: int = max_size
+        self._entries: dict[str, tuple[UserIdentity, float]] = {}  # Least recently updated first.
+        self._grams: dict[str, set[str]] = {}  # trigram -> racer ids
+        self._fields: dict[str, tuple[str, str]] = {}  # racer id -> normalised (username, display name)
+        self._usernames: dict[str, str] = {}  # normalised username -> racer id
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, racer_id: str, max_age: float | None = None) -> UserIdentity | None:
+        entry: tuple[UserIdentity, float] | None = self._entries.get(racer_id, None)
+        if entry is None or monotonic() - entry[1] > (max_age if max_age is not None else self._ttl):
+            return None
+        return entry[0]
+
+    def put(self, identity: UserIdentity) -> None:
+        previous: tuple[UserIdentity, float] | None = self._entries.get(identity.id, None)
+        if not identity.username and previous is not None:
+            # Incomplete identities (e.g. from a team page) must not overwrite a known username.
+            identity = UserIdentity(
+                id=identity.id, display_name=identity.display_name, username=previous[0].username
+            )
+        if previous is not None:
+            self.__remove(identity.id)
+        self._entries[identity.id] = (identity, monotonic())
+        self._fields[identity.id] = (normalise(identity.username), normalise(identity.display_name))
+        self.__index(identity)
+        while len(self._entries) > self._max_size:
+            self.__remove(next(iter(self._entries)))
+
+    def put_all(self, identities: Iterable[UserIdentity]) -> None:
+        for identity in identities:
+            self.put(identity)
+
+    def find(self, query: str) -> UserIdentity | None:
+        # Exact (case-insensitive) match on id or username. Those are unique on Klavia. Display names are not, so
+        # they are never matched here: Klavia's search must decide which racer is meant.
+        query = normalise(query)
+        identity: UserIdentity | None = self.get(query)
+        if identity is not None:
+            return identity
+        racer_id: str | None = self._usernames.get(query, None)
+        return self.get(racer_id) if racer_id is not None else None
+
+    def search(self, query: str, limit: int | None = None, max_age: float | None = None) -> list[UserIdentity]:
+        # Fresh identities that resemble the query, best match first.
+        query = normalise(query)
+        query_grams: set[str] = trigrams(query)
+        shared: Counter[str] = Counter()
+        for gram in query_grams:
+            shared.update(self._grams.get(gram, ()))
+        min_shared: int = max(1, int(len(query_grams) * IdentityCache.MinSharedGrams))
+        candidates: list[str] = [racer_id for racer_id, count in shared.items() if count >= min_shared]
+        if query in self._entries:
+            candidates.append(query)
+
+        scored: list[tuple[float, UserIdentity]] = []
+        for racer_id in candidates:
+            identity: UserIdentity | None = self.get(racer_id, max_age)
+            if identity is None:
+                continue
+            username, display_name = self._fields[racer_id]
+            score: float = 1 if query == racer_id else max(
+                field_similarity(query, query_grams, username),
+                field_similarity(query, query_grams, display_name)
+            )
+            if score >= IdentityCache.MinSimilarity:
+                scored.append((score, identity))
+        scored.sort(key=lambda s: s[0], reverse=True)
+        return [identity for _, identity in scored[:limit]]
+
+    def recent(self, limit: int, max_age: float | None = None) -> list[UserIdentity]:
+        # The most recently seen identities, newest first.
+        newest: list[tuple[UserIdentity, float]] = nlargest(limit, self._entries.values(), key=lambda e: e[1])
+        return [
+            identity for identity, _ in newest if self.get(identity.id, max_age) is not None
+        ]
+
+    def merge(self, query: str, racers: list[UserIdentity]) -> list[UserIdentity]:
+        # <racers> plus every known racer that matches the query, with their current names, best match first.
+        found: dict[str, UserIdentity] = {
+            identity.id: identity for identity in self.search(query) if matches(normalise(query), identity)
+        }
+        for racer in racers:
+            if racer.id not in found:
+                found[racer.id] = self.get(racer.id) or racer
+        return sorted(found.values(), key=lambda i: similarity(query, i), reverse=True)
+
+    def __index(self, identity: UserIdentity) -> None:
+        for gram in self.__grams(identity.id):
+            self._grams.setdefault(gram, set()).add(identity.id)
+        username: str = self._fields[identity.id][0]
+        if username:
+            self._usernames[username] = identity.id
+
+    def __remove(self, racer_id: str) -> None:
+        for gram in self.__grams(racer_id):
+            ids: set[str] | None = self._grams.get(gram, None)
+            if ids is not None:
+                ids.discard(racer_id)
+                if not ids:
+                    del self._grams[gram]
+        username: str = self._fields[racer_id][0]
+        if username and self._usernames.get(username, None) == racer_id:
+            del self._usernames[username]
+        del self._entries[racer_id]
+        del self._fields[racer_id]
+
+    def __grams(self, racer_id: str) -> set[str]:
+        return {gram for field in self._fields[racer_id] if field for gram in trigrams(field)}
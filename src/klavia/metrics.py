@@ -0,0 +1,192 @@
+from abc import ABC
+from asyncio import Task, create_task, get_running_loop, sleep
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from json import dumps
+from time import perf_counter
+from typing import Awaitable, Callable, Final, Iterator, ParamSpec, TypeVar
+
+from aiohttp import web
+
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    DefaultBuckets: Final[tuple[float, ...]] = (
+        .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 300
+    )
+
+    def __init__(self, buckets: tuple[float, ...] = DefaultBuckets) -> None:
+        self.buckets: tuple[float, ...] = buckets
+        self.counts: list[int] = [0] * (len(buckets) + 1)  # Last one is +Inf.
+        self.count: int = 0
+        self.sum: float = 0
+        self.max: float = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        # Upper bound of the bucket that contains the quantile. Good enough to spot slow tasks.
+        rank: float = q * self.count
+        seen: int = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Metrics(ABC):
+    # Process-wide registry of counters and timing histograms. (All times in seconds)
+    LoopLagInterval: Final[float] = .5
+
+    __Histograms: dict[str, dict[Labels, Histogram]] = {}
+    __Counters: dict[str, dict[Labels, float]] = {}
+    __Gauges: dict[str, dict[Labels, float]] = {}
+    __LoopLagMonitor: Task | None = None
+    __Exporter: web.AppRunner | None = None
+    __Logger: Task | None = None
+
+    @staticmethod
+    def observe(name: str, value: float, **labels: str) -> None:
+        histograms: dict[Labels, Histogram] = Metrics.__Histograms.setdefault(name, {})
+        key: Labels = tuple(sorted(labels.items()))
+        histogram: Histogram | None = histograms.get(key, None)
+        if histogram is None:
+            histogram = histograms[key] = Histogram()
+        histogram.observe(value)
+
+    @staticmethod
+    def increment(name: str, value: float = 1, **labels: str) -> None:
+        counters: dict[Labels, float] = Metrics.__Counters.setdefault(name, {})
+        key: Labels = tuple(sorted(labels.items()))
+        counters[key] = counters.get(key, 0) + value
+
+    @staticmethod
+    def set(name: str, value: float, **labels: str) -> None:
+        Metrics.__Gauges.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+
+    @staticmethod
+    @contextmanager
+    def time(name: str, **labels: str) -> Iterator[None]:
+        # Also works around awaits: with Metrics.time("klaval_task_seconds", task="..."): await ...
+        start: float = perf_counter()
+        outcome: str = "error"
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            Metrics.observe(name, perf_counter() - start, outcome=outcome, **labels)
+
+    @staticmethod
+    def timed(name: str, **labels: str) -> Callable[[Callable[P, Awaitable[T]]], Callable[P, Awaitable[T]]]:
+        # Decorator for coroutine functions.
+        def decorator(function: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+            @wraps(function)
+            async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+                with Metrics.time(name, **labels):
+                    return await function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def render() -> str:
+        # Prometheus text exposition format.
+        lines: list[str] = []
+
+        for name, counters in sorted(Metrics.__Counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            lines += [f"{name}{Metrics.__format_labels(key)} {value:g}" for key, value in counters.items()]
+        for name, gauges in sorted(Metrics.__Gauges.items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines += [f"{name}{Metrics.__format_labels(key)} {value:g}" for key, value in gauges.items()]
+        for name, histograms in sorted(Metrics.__Histograms.items()):
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in histograms.items():
+                cumulative: int = 0
+                for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le: str = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{name}_bucket{Metrics.__format_labels(key + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{Metrics.__format_labels(key)} {histogram.sum:g}")
+                lines.append(f"{name}_count{Metrics.__format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def summary() -> dict[str, dict[str, float | dict[str, float]]]:
+        # Compact form for structured log lines: counters, gauges and count/mean/p95/max of every histogram.
+        summary: dict[str, dict[str, float | dict[str, float]]] = {}
+        for name, counters in (Metrics.__Counters | Metrics.__Gauges).items():
+            summary[name] = {",".join(f"{k}={v}" for k, v in key) or "total": value for key, value in counters.items()}
+        for name, histograms in Metrics.__Histograms.items():
+            summary[name] = {
+                ",".join(f"{k}={v}" for k, v in key) or "total": {
+                    "count": h.count,
+                    "mean": round(h.sum / h.count, 4) if h.count else 0,
+                    "p95": round(h.quantile(.95), 4),
+                    "max": round(h.max, 4)
+                } for key, h in histograms.items()
+            }
+        return summary
+
+    @staticmethod
+    def start_loop_lag_monitor() -> None:
+        if Metrics.__LoopLagMonitor is None or Metrics.__LoopLagMonitor.done():
+            Metrics.__LoopLagMonitor = create_task(Metrics.__monitor_loop_lag())
+
+    @staticmethod
+    async def start_http_exporter(host: str, port: int) -> None:
+        # Serves Metrics.render() on http://<host>:<port>/metrics
+        if Metrics.__Exporter is not None:
+            return
+
+        async def handle(_: web.Request) -> web.Response:
+            return web.Response(text=Metrics.render(), content_type="text/plain")
+
+        app: web.Application = web.Application()
+        app.router.add_get("/metrics", handle)
+        Metrics.__Exporter = web.AppRunner(app)
+        await Metrics.__Exporter.setup()
+        await web.TCPSite(Metrics.__Exporter, host, port).start()
+        print(f"Serving metrics on http://{host}:{port}/metrics")
+
+    @staticmethod
+    def start_logging(interval: float) -> None:
+        # Prints one structured (JSON) log line with all metrics every <interval> seconds.
+        if Metrics.__Logger is None or Metrics.__Logger.done():
+            Metrics.__Logger = create_task(Metrics.__log_periodically(interval))
+
+    @staticmethod
+    async def __monitor_loop_lag() -> None:
+        loop = get_running_loop()
+        while True:
+            start: float = loop.time()
+            await sleep(Metrics.LoopLagInterval)
+            lag: float = max(0.0, loop.time() - start - Metrics.LoopLagInterval)
+            Metrics.observe("klaval_event_loop_lag_seconds", lag)
+            Metrics.set("klaval_event_loop_lag_last_seconds", lag)
+
+    @staticmethod
+    async def __log_periodically(interval: float) -> None:
+        while True:
+            await sleep(interval)
+            print(f"metrics {dumps(Metrics.summary(), separators=(',', ':'))}")
+
+    @staticmethod
+    def __format_labels(labels: Labels) -> str:
+        if not labels:
+            return ""
+        escaped: list[str] = []
+        for key, value in labels:
+            value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            escaped.append(f'{key}="{value}"')
+        return "{" + ",".join(escaped) + "}"
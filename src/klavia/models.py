@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class UserIdentity:
+    id: str
+    display_name: str
+    username: str
+
+
+@dataclass
+class CarStats:
+    races: int
+    dqs: int
+    avg_wpm: float
+    avg_acc: float
+    top_wpm: float
+    top_acc: float
+    perf_acc: int
+
+
+@dataclass
+class Car:
+    name: str
+    image_url: str
+
+
+@dataclass
+class Quest:
+    name: str
+
+
+@dataclass
+class UserQuestProgress:
+    quest: Quest
+    progress: int
+
+
+@dataclass
+class UserQuests:
+    user_id: str
+    display_name: str
+    quest_progress: list[UserQuestProgress]
+
+
+@dataclass
+class UserStatOverview:
+    lifetime_races: int
+    longest_session: int
+    top_wpm: float
+    current_wpm: float
+    perfect_races: int
+    current_acc: float
+
+
+@dataclass
+class UserStats:
+    user_id: str
+    display_name: str
+    overview: UserStatOverview
+    # Add more stats here!
+
+
+@dataclass
+class Garage:
+    user_id: str
+    display_name: str
+    cars: list[Car]
+    selected_car: Car
+    selected_stats: CarStats
+
+
+@dataclass
+class Team:
+    name: str
+    tag: str
+    leader: UserIdentity
+    agents: list[UserIdentity]
+    members: list[UserIdentity]
+
+
+@dataclass
+class ShopOffer:
+    name: str
+    price: int
+    image_url: str
+
+
+@dataclass
+class Shop:
+    seasonal_offers: list[ShopOffer]
+    alices_deals: list[ShopOffer]
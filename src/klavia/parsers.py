@@ -0,0 +1,312 @@
+from abc import ABC
+from asyncio import get_running_loop
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from importlib.util import find_spec
+from json import loads
+from os import cpu_count
+from typing import Callable, Final, TypeVar
+
+from bs4 import BeautifulSoup, ResultSet, SoupStrainer
+from bs4.element import Tag
+
+from klavia.identities import similarity
+from klavia.metrics import Metrics
+from klavia.models import (
+    UserIdentity, CarStats, Car, Quest, UserQuestProgress, UserQuests, UserStatOverview, UserStats, ShopOffer
+)
+from klavia.urls import KlaviaUrls
+
+
+T = TypeVar("T")
+
+
+# BeautifulSoup is CPU bound. Parsing runs in these worker threads, so that the event loop stays responsive.
+ParserPool: Final[ThreadPoolExecutor] = ThreadPoolExecutor(
+    max_workers=min(4, cpu_count() or 1),
+    thread_name_prefix="klavia-parser"
+)
+
+
+async def parse_async(parser: Callable[..., T], *args) -> T:
+    with Metrics.time("klavia_parse_seconds", parser=parser.__name__):
+        return await get_running_loop().run_in_executor(ParserPool, parser, *args)
+
+
+class HtmlParser(ABC):
+    # BeautifulSoup tree builders, fastest first. html.parser is part of the standard library and always available.
+    # The reference parser on whole pages is the default. Faster backends and partial parsing are opt-in, until
+    # tools.parser_parity has passed on recorded Klavia pages.
+    Backends: Final[tuple[str, ...]] = ("lxml", "html.parser")
+    ReferenceBackend: Final[str] = "html.parser"
+
+    __Backend: str = ReferenceBackend
+    __Partial: bool = False
+
+    @staticmethod
+    def get() -> str:
+        return HtmlParser.__Backend
+
+    @staticmethod
+    def fastest() -> str:
+        return next(b for b in HtmlParser.Backends if HtmlParser.is_available(b))
+
+    @staticmethod
+    def is_available(backend: str) -> bool:
+        return backend == "html.parser" or find_spec(backend) is not None
+
+    @staticmethod
+    def use(backend: str | None = None, partial: bool = False) -> None:
+        # backend=None uses the reference parser. partial=True only parses the parts of a page that are needed.
+        if backend is not None and (backend not in HtmlParser.Backends or not HtmlParser.is_available(backend)):
+            raise ValueError(f"HTML parser backend '{backend}' is not available.")
+        HtmlParser.__Backend = backend if backend is not None else HtmlParser.ReferenceBackend
+        HtmlParser.__Partial = partial
+
+    @staticmethod
+    def is_partial() -> bool:
+        return HtmlParser.__Partial
+
+
+# Partial parsing: Only these parts of a page are turned into a tree. Everything else is skipped while parsing.
+TeamStrainer: Final[SoupStrainer] = SoupStrainer(["h1", "table"])
+StatsStrainer: Final[SoupStrainer] = SoupStrainer(["h3", "strong", "table"])
+ShopStrainer: Final[SoupStrainer] = SoupStrainer("div", attrs={"class": "row g-3"})
+
+
+def make_soup(html: str, strainer: SoupStrainer | None = None) -> BeautifulSoup:
+    return BeautifulSoup(html, HtmlParser.get(), parse_only=strainer if HtmlParser.is_partial() else None)
+
+
+@dataclass
+class TeamRow:
+    racer_id: str
+    display_name: str
+    badge: str | None
+
+
+@dataclass
+class GaragePage:
+    display_name: str
+    car_names: list[str]
+    selected_car_name: str
+    selected_stats: CarStats
+
+
+@dataclass
+class TeamPage:
+    name: str
+    rows: list[TeamRow]
+
+
+def parse_csrf_token(html: str) -> str:
+    soup: BeautifulSoup = make_soup(html)
+    return soup.find("meta", {"name": "csrf-token"})["content"]
+
+
+def parse_display_name(html: str) -> str:
+    soup: BeautifulSoup = make_soup(html)
+    return soup.find("h3").get_text(strip=True)
+
+
+def parse_shop_section(html: str) -> list[ShopOffer]:
+    soup: BeautifulSoup = make_soup(html, ShopStrainer)
+    offers_table = soup.find("div", attrs={"class": "row g-3"})
+    offers: list[ShopOffer] = []
+    for offer_div in offers_table.find_all("div", attrs={"class": "col-lg-6"}):
+        img_url: str = offer_div.find("div", attrs={"class": "mb-3"}).find("img").get("src")
+        offers.append(
+            ShopOffer(
+                name=offer_div.find("h4").get_text().strip("\n").split("\n")[0],
+                price=int(offer_div.find("strong").get_text().replace(",", "")),
+                image_url=(KlaviaUrls.KlaviaUrl if img_url[0] == "/" else "") + img_url
+            )
+        )
+    return offers
+
+
+def parse_team(html: str) -> TeamPage:
+    soup: BeautifulSoup = make_soup(html, TeamStrainer)
+
+    name: str = soup.find("h1").get_text(strip=True)
+
+    rows: list[TeamRow] = []
+    member_table: Tag = soup.find("table", attrs={"id": "tbl-daily-tracker"})
+    member_table_body: Tag = member_table.find("tbody")
+    for tr in member_table_body.find_all("tr"):
+        racer: Tag; squad: Tag; joined: Tag; last_race: Tag; team_races: Tag  # noqa  Ugly, but type hints. :(
+        racer, squad, joined, last_race, team_races = tr.find_all("td")[:5]
+        # racer:
+        racer_link: Tag = racer.find("a")
+        badge: Tag | None = racer.find("div", attrs={"class": "badge"})
+        rows.append(
+            TeamRow(
+                racer_id=racer_link["href"].split("/")[-1],
+                display_name=racer_link.get_text(strip=True),
+                badge=badge["title"] if badge else None
+            )
+        )
+
+    return TeamPage(
+        name=name,
+        rows=rows
+    )
+
+
+def parse_racer_search(json_text: str, search: str) -> list[UserIdentity]:
+    data: list[tuple[int, str, str]] = loads(json_text)
+    racers: list[UserIdentity] = [
+        UserIdentity(
+            id=str(d[0]),
+            display_name=d[1],
+            username=d[2]
+        ) for d in data
+    ]
+    # Sort by similarity to search string. (descending) Klavia's sorting is pretty random...
+    return sorted(racers, key=lambda r: similarity(search, r), reverse=True)
+
+
+def parse_quests(html: str, user_id: str) -> UserQuests:
+    soup: BeautifulSoup = make_soup(html)
+    username: str = soup.find("h3").get_text(strip=True)
+
+    quest_names: list[str] = [q.text for q in soup.find_all("a", attrs={"data-turbo-frame": "modal"}) if len]
+    try:
+        quest_names[0] = soup.find("h5").get_text(strip=True)
+    except AttributeError:
+        pass  # No active quest! -> ignore
+    quest_progs: list[int] = [
+        int(p.get("data-progress-percentage-value"))
+        for p in soup.find_all("div", attrs={"data-controller": "progress"})
+    ]
+    quest_progress: list[UserQuestProgress] = [
+        UserQuestProgress(
+            Quest(
+                name=name
+            ),
+            progress=prog
+        ) for name, prog in zip(quest_names, quest_progs)
+    ]
+
+    return UserQuests(
+        user_id=user_id,
+        display_name=username,
+        quest_progress=quest_progress
+    )
+
+
+def parse_stats(html: str, user_id: str) -> UserStats:
+    soup: BeautifulSoup = make_soup(html, StatsStrainer)
+    username: str = soup.find("h3").get_text(strip=True)
+
+    try:
+        main_stats: list[Tag] = soup.find_all("strong")
+        lifetime_races: int = int(main_stats[0].get_text(strip=True).split(" ")[0].replace(",", ""))
+        top_wpm: float = float(main_stats[1].get_text(strip=True).split(" ")[0])
+        perfect_acc: int = int(main_stats[2].get_text(strip=True))
+
+        # Label and value cell of every table row, collected in a single pass over all cells:
+        minor_stats: list[tuple[str, Tag]] = [
+            (td.get_text(strip=True), value_td)
+            for td in soup.find_all("td")
+            if (value_td := td.find_next_sibling("td"))
+        ]
+
+        def get_minor_stat(label: str) -> str:
+            for text, value_td in minor_stats:
+                if text.startswith(label):
+                    return value_td.get_text(strip=True)
+            return "-1"
+
+        longest_session: int = int(get_minor_stat("Longest Session").split()[0].replace(",", ""))
+        current_wpm: float = float(get_minor_stat("Current Speed").split()[0])
+        current_acc: float = float(get_minor_stat("Current Accuracy").strip("%"))
+
+        return UserStats(
+            user_id=user_id,
+            display_name=username,
+            overview=UserStatOverview(
+                lifetime_races=lifetime_races,
+                longest_session=longest_session,
+                top_wpm=top_wpm,
+                current_wpm=current_wpm,
+                perfect_races=perfect_acc,
+                current_acc=current_acc
+            )
+        )
+    except IndexError:
+        # User might not have stats, yet.
+        return UserStats(
+            user_id=user_id,
+            display_name=username,
+            overview=UserStatOverview(
+                lifetime_races=0,
+                longest_session=0,
+                top_wpm=0,
+                current_wpm=0,
+                perfect_races=0,
+                current_acc=0
+            )
+        )
+
+
+def parse_garage(html: str) -> GaragePage:
+    soup: BeautifulSoup = make_soup(html)
+    username: str = soup.find("h3").get_text(strip=True)
+    car_names: list[str] = [
+        car_tag.get("title").split("|")[0].strip()
+        for car_tag in soup.find_all("a", attrs={"data-turbo-frame": "selected_car"})
+    ]
+    selected_car_name: str = (
+        soup
+        .find("div", id="selected_car")
+        .find("div", class_="card-header")
+        .find(text=True, recursive=False)
+        .strip()
+    )
+
+    try:
+        selected_stats_table: Tag = soup.find("tbody")
+        selected_stats_elems: ResultSet[Tag] = selected_stats_table.find_all("td", attrs={"class": "text-end"})
+
+        # noinspection PyCallingNonCallable
+        selected_stats: CarStats = CarStats(
+            races=int(selected_stats_elems[0].getText(strip=True)),
+            dqs=int(selected_stats_elems[1].getText(strip=True)),
+            avg_wpm=float(selected_stats_elems[2].getText(strip=True)),
+            avg_acc=float(selected_stats_elems[3].getText(strip=True)[:-1]),
+            top_wpm=float(selected_stats_elems[4].getText(strip=True)),
+            top_acc=float(selected_stats_elems[5].getText(strip=True)[:-1]),
+            perf_acc=int(selected_stats_elems[6].getText(strip=True))
+        )
+    except AttributeError:
+        # User might have no stats, yet.
+        selected_stats: CarStats = CarStats(
+            races=0,
+            dqs=0,
+            avg_wpm=0,
+            avg_acc=0,
+            top_wpm=0,
+            top_acc=0,
+            perf_acc=0
+        )
+
+    return GaragePage(
+        display_name=username,
+        car_names=car_names,
+        selected_car_name=selected_car_name,
+        selected_stats=selected_stats
+    )
+
+
+def parse_cars(html: str) -> dict[str, Car]:
+    soup: BeautifulSoup = make_soup(html)
+    cars: dict[str, Car] = {}
+    for car_tr in soup.find_all("tr")[1:]:
+        image: Tag = car_tr.find("img")
+        name: str = image.attrs["title"].strip()
+        cars[name] = Car(
+            name=name,
+            image_url=image.attrs["src"]
+        )
+    return cars
@@ -0,0 +1,22 @@
+from asyncio import Lock, sleep
+from time import monotonic
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self._rate: float = rate  # tokens per second
+        self._capacity: float = capacity if capacity is not None else max(1.0, rate)
+        self._tokens: float = self._capacity
+        self._updated_at: float = monotonic()
+        self._lock: Lock = Lock()  # Waiters are served in order of arrival.
+
+    async def acquire(self, tokens: float = 1) -> None:
+        async with self._lock:
+            while True:
+                now: float = monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+                self._updated_at = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await sleep((tokens - self._tokens) / self._rate)
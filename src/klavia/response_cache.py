@@ -0,0 +1,80 @@
+from asyncio import Task, create_task, shield
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Awaitable, Callable, Final, TypeVar
+
+from klavia.metrics import Metrics
+
+
+T = TypeVar("T")
+
+
+class ResponseCache:
+    DefaultTtls: Final[dict[str, float]] = {
+        "garage": 60,
+        "stats": 120,
+        "quests": 60
+    }
+    DefaultMaxSize: Final[int] = 512
+
+    def __init__(self, ttls: dict[str, float] | None = None, max_size: int = DefaultMaxSize) -> None:
+        self._ttls: dict[str, float] = ResponseCache.DefaultTtls | (ttls or {})
+        self._max_size: int = max_size
+        self._entries: OrderedDict[tuple[str, str], tuple[Any, float]] = OrderedDict()
+        self._in_flight: dict[tuple[str, str], Task] = {}
+        self._hits: int = 0
+        self._misses: int = 0
+        self._coalesced: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    @property
+    def coalesced(self) -> int:
+        return self._coalesced
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, endpoint: str, key: str, fetch: Callable[[], Awaitable[T]], fresh: bool = False) -> T:
+        cache_key: tuple[str, str] = (endpoint, key)
+
+        if not fresh:
+            entry: tuple[Any, float] | None = self._entries.get(cache_key, None)
+            if entry is not None and monotonic() - entry[1] <= self._ttls.get(endpoint, 0):
+                self._entries.move_to_end(cache_key)
+                self._hits += 1
+                Metrics.increment("klavia_response_cache_total", endpoint=endpoint, result="hit")
+                return entry[0]
+
+        task: Task | None = self._in_flight.get(cache_key, None)
+        if task is not None:
+            # Someone is already fetching this page -> wait for the same result instead of scraping it again.
+            self._coalesced += 1
+            Metrics.increment("klavia_response_cache_total", endpoint=endpoint, result="coalesced")
+        else:
+            self._misses += 1
+            Metrics.increment("klavia_response_cache_total", endpoint=endpoint, result="miss")
+            task = create_task(fetch())
+            task.add_done_callback(lambda t: self._on_fetched(cache_key, t))
+            self._in_flight[cache_key] = task
+        # Shielded, so that a cancelled caller does not cancel the fetch for everyone else.
+        return await shield(task)
+
+    def invalidate(self, endpoint: str, key: str) -> None:
+        self._entries.pop((endpoint, key), None)
+
+    def _on_fetched(self, cache_key: tuple[str, str], task: Task) -> None:
+        if self._in_flight.get(cache_key, None) is task:
+            del self._in_flight[cache_key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._entries[cache_key] = (task.result(), monotonic())
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
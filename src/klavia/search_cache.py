@@ -0,0 +1,78 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Final
+
+from klavia.identities import normalise
+from klavia.metrics import Metrics
+from klavia.models import UserIdentity
+
+
+class SearchCache:
+    # Results of Klavia's racer autocomplete by normalised query. Every racer that matches "henrikx" also matches
+    # "henrik". So if nobody matches "henrik", nobody matches any longer query either, and refining a name that does
+    # not exist only causes one request. Non-empty results are never reused for other queries, because Klavia
+    # returns a limited number of racers and its page size is unknown.
+    # Ids may not be matched by part, so numeric queries are only answered by exact entries.
+    DefaultTtl: Final[float] = 60 * 30  # New racers show up within this time.
+    DefaultMaxSize: Final[int] = 256
+
+    def __init__(self, ttl: float = DefaultTtl, max_size: int = DefaultMaxSize) -> None:
+        self._ttl: float = ttl
+        self._max_size: int = max_size
+        self._entries: OrderedDict[str, tuple[list[UserIdentity], float]] = OrderedDict()
+        self._hits: int = 0
+        self._prefix_hits: int = 0
+        self._misses: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def prefix_hits(self) -> int:
+        return self._prefix_hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, query: str) -> list[UserIdentity] | None:
+        # None, if Klavia must be asked.
+        query = normalise(query)
+        racers: list[UserIdentity] | None = self.__get_fresh(query)
+        if racers is not None:
+            self._hits += 1
+            Metrics.increment("klavia_search_cache_total", result="hit")
+            return racers
+
+        prefix_lengths: range = range(0) if query.isdigit() else range(len(query) - 1, 0, -1)
+        for length in prefix_lengths:
+            racers = self.__get_fresh(query[:length])
+            if racers is not None and len(racers) == 0:
+                self._prefix_hits += 1
+                Metrics.increment("klavia_search_cache_total", result="prefix")
+                return []
+
+        self._misses += 1
+        Metrics.increment("klavia_search_cache_total", result="miss")
+        return None
+
+    def put(self, query: str, racers: list[UserIdentity]) -> None:
+        query = normalise(query)
+        self._entries[query] = (racers, monotonic())
+        self._entries.move_to_end(query)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def __get_fresh(self, query: str) -> list[UserIdentity] | None:
+        entry: tuple[list[UserIdentity], float] | None = self._entries.get(query, None)
+        if entry is None:
+            return None
+        if monotonic() - entry[1] > self._ttl:
+            del self._entries[query]
+            return None
+        self._entries.move_to_end(query)
+        return entry[0]
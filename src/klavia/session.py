@@ -0,0 +1,220 @@
+from asyncio import Lock, sleep
+from dataclasses import dataclass, field
+from json import loads
+from math import ceil
+from random import uniform
+from time import monotonic
+from typing import Any, Final
+from urllib.parse import urlsplit
+
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector
+
+from klavia.metrics import Metrics
+from klavia.parsers import parse_async, parse_csrf_token
+from klavia.rate_limit import TokenBucket
+from klavia.transport import CircuitBreaker, RequestQueue, SharedTransport
+from klavia.urls import KlaviaUrls
+
+
+@dataclass
+class KlaviaResponse:
+    url: str
+    status: int
+    text: str
+    headers: dict[str, str] = field(default_factory=dict)  # Only ETag and Last-Modified are kept.
+
+    def json(self) -> Any:
+        return loads(self.text)
+
+
+class LoginError(Exception):
+    pass
+
+
+class KlaviaSession:
+    KlaviaUrl: Final[str] = KlaviaUrls.KlaviaUrl
+    SignInUrl: Final[str] = KlaviaUrls.SignInUrl
+    ConnectionLimit: Final[int] = 16
+    ConnectTimeout: Final[float] = 5
+    ReadTimeout: Final[float] = 20  # Between two chunks of a response, not for the whole response.
+    MaxAttempts: Final[int] = 3  # GET requests only. Klavia may not be idempotent for anything else.
+    RetryDelay: Final[float] = .5  # Upper bound of the first retry's delay. Doubled on every retry.
+    MaxRetryDelay: Final[float] = 8
+    RetryStatuses: Final[frozenset[int]] = frozenset({429, 500, 502, 503, 504})
+    LoginRetryDelay: Final[float] = 30  # After a rejected login. Doubled on every further rejection.
+    MaxLoginRetryDelay: Final[float] = 60 * 30
+
+    def __init__(
+            self,
+            username: str,
+            password: str,
+            connection_limit: int = ConnectionLimit,
+            rate_limit: TokenBucket | None = None,
+            circuit_breaker: CircuitBreaker | None = None
+    ) -> None:
+        # Rate limit and circuit breaker default to the process-wide ones. Requests wait for the rate limit in
+        # a priority queue. (See RequestPriority)
+        self._username: str = username
+        self._password: str = password
+        self._connection_limit: int = connection_limit
+        self._request_queue: RequestQueue = (
+            RequestQueue(rate_limit) if rate_limit is not None else SharedTransport.request_queue()
+        )
+        self._circuit_breaker: CircuitBreaker = (
+            circuit_breaker if circuit_breaker is not None else SharedTransport.circuit_breaker()
+        )
+        self._client: ClientSession | None = None  # Created lazily, because it must be bound to the running loop.
+        self._closed: bool = False
+        self._login_lock: Lock = Lock()
+        self._generation: int = 0  # Incremented on every successful login.
+        self._login_count: int = 0
+        self._request_count: int = 0
+        self._login_failures: int = 0  # Rejected logins in a row.
+        self._login_retry_at: float = 0  # No login is attempted before this time. (monotonic)
+
+    @property
+    def login_count(self) -> int:
+        return self._login_count
+
+    @property
+    def request_count(self) -> int:
+        return self._request_count
+
+    @property
+    def circuit_breaker(self) -> CircuitBreaker:
+        return self._circuit_breaker
+
+    async def get(self, url: str, headers: dict[str, str] | None = None) -> KlaviaResponse:
+        generation: int = self._generation
+        if generation == 0:
+            await self._login(generation)
+            generation = self._generation
+
+        response: KlaviaResponse = await self._fetch(url, headers)
+        if KlaviaSession._is_expired(response):
+            # Session cookie has expired -> log in again and retry once.
+            await self._login(generation)
+            response = await self._fetch(url, headers)
+        return response
+
+    async def close(self) -> None:
+        # Final. Requests that are still in flight (e.g. shielded fetches) must not open a new client afterwards,
+        # because nobody would close it.
+        self._closed = True
+        if self._client is not None and not self._client.closed:
+            await self._client.close()
+        self._client = None
+
+    def _get_client(self) -> ClientSession:
+        if self._closed:
+            raise RuntimeError("The Klavia session has been closed.")
+        if self._client is None or self._client.closed:
+            # One pooled connector for all requests, so that connections to Klavia are kept alive and reused.
+            self._client = ClientSession(
+                connector=TCPConnector(limit=self._connection_limit),
+                timeout=ClientTimeout(sock_connect=KlaviaSession.ConnectTimeout, sock_read=KlaviaSession.ReadTimeout)
+            )
+        return self._client
+
+    async def _fetch(self, url: str, headers: dict[str, str] | None = None) -> KlaviaResponse:
+        # GET within the request budget. Network errors, timeouts and overload responses are retried with jittered
+        # exponential backoff. Requests that still fail count towards opening the circuit breaker.
+        self._circuit_breaker.check()
+        response: KlaviaResponse | None = None
+        error: Exception | None = None
+        for attempt in range(KlaviaSession.MaxAttempts):
+            await self._acquire()
+            try:
+                response = await self._request("GET", url, headers=headers)
+                error = None
+            except (ClientError, TimeoutError) as ex:
+                response = None
+                error = ex
+            if response is not None and response.status not in KlaviaSession.RetryStatuses:
+                self._circuit_breaker.record_success()
+                return response
+            if attempt + 1 < KlaviaSession.MaxAttempts:
+                reason: str = type(error).__name__ if error is not None else str(response.status)
+                Metrics.increment("klavia_http_retries_total", reason=reason)
+                await sleep(uniform(0, min(KlaviaSession.MaxRetryDelay, KlaviaSession.RetryDelay * 2 ** attempt)))
+        self._circuit_breaker.record_failure()
+        if error is not None:
+            raise error
+        return response
+
+    async def _acquire(self) -> None:
+        await self._request_queue.acquire()
+
+    async def _request(
+            self,
+            method: str,
+            url: str,
+            data: dict[str, str] | None = None,
+            headers: dict[str, str] | None = None
+    ) -> KlaviaResponse:
+        self._request_count += 1
+        with Metrics.time("klavia_http_request_seconds", method=method):
+            async with self._get_client().request(method, url, data=data, headers=headers) as response:
+                body: bytes = await response.read()  # text() decodes this buffered body.
+                Metrics.increment("klavia_http_requests_total", method=method, status=str(response.status))
+                Metrics.increment("klavia_http_response_bytes_total", len(body), method=method)
+                return KlaviaResponse(
+                    url=str(response.url),
+                    status=response.status,
+                    text=await response.text(),
+                    headers={
+                        name: response.headers[name] for name in ("ETag", "Last-Modified") if name in response.headers
+                    }
+                )
+
+    async def _login(self, seen_generation: int) -> None:
+        async with self._login_lock:
+            if self._generation != seen_generation:
+                return  # Someone else has already logged in again while we were waiting for the lock.
+            if monotonic() < self._login_retry_at:
+                # Klavia has rejected the last login. Do not try again with every request.
+                raise LoginError(
+                    f"Klavia has rejected the login. Retrying in {ceil(self._login_retry_at - monotonic())} seconds."
+                )
+
+            self._get_client().cookie_jar.clear()
+            login_page: KlaviaResponse = await self._fetch(KlaviaSession.KlaviaUrl)
+            csrf_token: str = await parse_async(parse_csrf_token, login_page.text)
+
+            await self._acquire()
+            response: KlaviaResponse = await self._request(
+                "POST",
+                KlaviaSession.SignInUrl,
+                data={
+                    "authenticity_token": csrf_token,
+                    "racer[email]": self._username,
+                    "racer[password]": self._password,
+                    "racer[remember_me]": "0",
+                    "commit": "Sign+In"
+                }
+            )
+            # Klavia redirects away from the sign in page after a successful login. A rejected one renders it again.
+            if response.status >= 400 or KlaviaSession._is_expired(response):
+                self._login_failures += 1
+                delay: float = min(
+                    KlaviaSession.MaxLoginRetryDelay,
+                    KlaviaSession.LoginRetryDelay * 2 ** (self._login_failures - 1)
+                )
+                self._login_retry_at = monotonic() + delay
+                Metrics.increment("klavia_login_failures_total")
+                raise LoginError(
+                    f"Klavia has rejected the login (status {response.status}). Check the credentials. "
+                    f"Retrying in {ceil(delay)} seconds."
+                )
+
+            self._login_failures = 0
+            self._login_retry_at = 0
+            self._generation += 1
+            self._login_count += 1
+            print(f"Logged in to Klavia. (logins: {self._login_count}, requests: {self._request_count})")
+
+    @staticmethod
+    def _is_expired(response: KlaviaResponse) -> bool:
+        # Klavia redirects to the sign in page, if the session is no longer valid:
+        sign_in_path: str = urlsplit(KlaviaSession.SignInUrl).path
+        return response.status == 401 or urlsplit(response.url).path.rstrip("/") == sign_in_path
@@ -0,0 +1,201 @@
+from abc import ABC
+from asyncio import Future, Task, create_task, get_running_loop
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum, StrEnum
+from math import ceil
+from time import monotonic
+from typing import Final, Iterator
+
+from klavia.metrics import Metrics
+from klavia.rate_limit import TokenBucket
+
+
+class CircuitState(StrEnum):
+    Closed = "closed"  # Requests pass.
+    Open = "open"  # Klavia is considered down. Requests fail immediately.
+    HalfOpen = "half_open"  # One trial request decides whether to close or open again.
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, retry_in: float) -> None:
+        super().__init__(f"Klavia is unavailable. Requests are paused for another {ceil(retry_in)} seconds.")
+        self.retry_in: float = retry_in
+
+
+class CircuitBreaker:
+    # Stops sending requests after several failed ones in a row, so that commands fail fast while Klavia is down
+    # and Klavia is not hammered while it recovers.
+    FailureThreshold: Final[int] = 5
+    ResetTimeout: Final[float] = 30  # Seconds until a trial request is let through.
+    StateValues: Final[dict[CircuitState, int]] = {
+        CircuitState.Closed: 0,
+        CircuitState.HalfOpen: 1,
+        CircuitState.Open: 2
+    }
+
+    def __init__(self, failure_threshold: int = FailureThreshold, reset_timeout: float = ResetTimeout) -> None:
+        self._failure_threshold: int = failure_threshold
+        self._reset_timeout: float = reset_timeout
+        self._state: CircuitState = CircuitState.Closed
+        self._failures: int = 0
+        self._opened_at: float = 0
+        self._trial_started_at: float | None = None
+        Metrics.set("klavia_circuit_state", CircuitBreaker.StateValues[self._state])
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state == CircuitState.Open and self.retry_in == 0:
+            return CircuitState.HalfOpen
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == CircuitState.Open
+
+    @property
+    def retry_in(self) -> float:
+        # Seconds until requests are let through again.
+        if self._state != CircuitState.Open:
+            return 0
+        return max(0.0, self._opened_at + self._reset_timeout - monotonic())
+
+    def check(self) -> None:
+        # Call before every request. Raises CircuitOpenError, if the request must not be sent.
+        if self._state == CircuitState.Closed:
+            return
+        if self._state == CircuitState.Open:
+            if self.retry_in > 0:
+                Metrics.increment("klavia_circuit_rejected_total")
+                raise CircuitOpenError(self.retry_in)
+            self.__transition(CircuitState.HalfOpen)
+        if self._trial_started_at is not None and monotonic() - self._trial_started_at < self._reset_timeout:
+            # Only one trial at a time. (A trial that never reported back is replaced after the reset timeout)
+            Metrics.increment("klavia_circuit_rejected_total")
+            raise CircuitOpenError(self._trial_started_at + self._reset_timeout - monotonic())
+        self._trial_started_at = monotonic()
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._trial_started_at = None
+        if self._state != CircuitState.Closed:
+            self.__transition(CircuitState.Closed)
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_started_at = None
+        if self._state == CircuitState.HalfOpen or self._failures >= self._failure_threshold:
+            self._opened_at = monotonic()
+            if self._state != CircuitState.Open:
+                self.__transition(CircuitState.Open)
+
+    def __transition(self, state: CircuitState) -> None:
+        print(f"Klavia circuit breaker: {self._state} -> {state}")
+        self._state = state
+        Metrics.set("klavia_circuit_state", CircuitBreaker.StateValues[state])
+        Metrics.increment("klavia_circuit_transitions_total", state=str(state))
+
+
+class RequestPriority(IntEnum):
+    Interactive = 0  # Someone is waiting for the answer. (Commands)
+    Background = 1  # Scheduled tasks
+
+
+# Priority of the requests made in the current context. Tasks inherit the priority of the code that created them.
+CurrentPriority: ContextVar[RequestPriority] = ContextVar(
+    "klavia_request_priority",
+    default=RequestPriority.Interactive
+)
+
+
+@contextmanager
+def request_priority(priority: RequestPriority) -> Iterator[None]:
+    # with request_priority(RequestPriority.Background): await task()
+    token = CurrentPriority.set(priority)
+    try:
+        yield
+    finally:
+        CurrentPriority.reset(token)
+
+
+class RequestQueue:
+    # Hands out the rate limit's tokens by priority: Waiting interactive requests go first. Background requests
+    # still get every <InteractiveStreak + 1>th token while both are waiting, so that they are never starved.
+    InteractiveStreak: Final[int] = 4
+
+    def __init__(self, rate_limit: TokenBucket) -> None:
+        self._rate_limit: TokenBucket = rate_limit
+        self._waiting: dict[RequestPriority, deque[tuple[Future, float]]] = {p: deque() for p in RequestPriority}
+        self._streak: int = 0  # Interactive requests served in a row while background requests were waiting.
+        self._dispatcher: Task | None = None
+
+    async def acquire(self, priority: RequestPriority | None = None) -> None:
+        priority = priority if priority is not None else CurrentPriority.get()
+        future: Future = get_running_loop().create_future()
+        self._waiting[priority].append((future, monotonic()))
+        self.__report_depth(priority)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = create_task(self.__dispatch())
+        await future
+
+    async def __dispatch(self) -> None:
+        while self.__drop_cancelled():
+            await self._rate_limit.acquire()
+            self.__drop_cancelled()
+            priority: RequestPriority | None = self.__next_priority()
+            if priority is None:
+                continue  # Everyone gave up while waiting for the token.
+            future, enqueued_at = self._waiting[priority].popleft()
+            future.set_result(None)
+            Metrics.observe("klavia_request_queue_wait_seconds", monotonic() - enqueued_at, priority=priority.name)
+            self.__report_depth(priority)
+
+    def __next_priority(self) -> RequestPriority | None:
+        interactive: bool = len(self._waiting[RequestPriority.Interactive]) > 0
+        background: bool = len(self._waiting[RequestPriority.Background]) > 0
+        if interactive and (not background or self._streak < RequestQueue.InteractiveStreak):
+            self._streak = self._streak + 1 if background else 0
+            return RequestPriority.Interactive
+        self._streak = 0
+        return RequestPriority.Background if background else None
+
+    def __drop_cancelled(self) -> bool:
+        # Removes waiters that gave up (e.g. cancelled commands) from the front of the queues.
+        # Returns whether anyone is still waiting.
+        for priority, waiting in self._waiting.items():
+            while waiting and waiting[0][0].done():
+                waiting.popleft()
+                self.__report_depth(priority)
+        return any(self._waiting.values())
+
+    def __report_depth(self, priority: RequestPriority) -> None:
+        Metrics.set("klavia_request_queue_depth", len(self._waiting[priority]), priority=priority.name)
+
+
+class SharedTransport(ABC):
+    # Process-wide request budget and circuit breaker. Shared by all sessions, because Klavia sees them all as us.
+    RequestsPerSecond: Final[float] = 5
+    Burst: Final[float] = 10
+
+    __RequestQueue: RequestQueue | None = None
+    __CircuitBreaker: CircuitBreaker | None = None
+
+    @staticmethod
+    def configure(requests_per_second: float = RequestsPerSecond, burst: float | None = None) -> None:
+        SharedTransport.__RequestQueue = RequestQueue(TokenBucket(
+            requests_per_second,
+            burst if burst is not None else max(SharedTransport.Burst, requests_per_second)
+        ))
+
+    @staticmethod
+    def request_queue() -> RequestQueue:
+        if SharedTransport.__RequestQueue is None:
+            SharedTransport.configure()
+        return SharedTransport.__RequestQueue
+
+    @staticmethod
+    def circuit_breaker() -> CircuitBreaker:
+        if SharedTransport.__CircuitBreaker is None:
+            SharedTransport.__CircuitBreaker = CircuitBreaker()
+        return SharedTransport.__CircuitBreaker
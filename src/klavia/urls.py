@@ -0,0 +1,20 @@
+from typing import Final
+
+
+class KlaviaUrls:
+    KlaviaUrl: Final[str] = "https://klavia.io"
+    SignInUrl: Final[str] = KlaviaUrl + "/racers/sign_in"
+    RacerUrl: Final[str] = KlaviaUrl + "/racers/{user_id}"
+    GarageUrl: Final[str] = RacerUrl + "/garage"
+    StatsUrl: Final[str] = RacerUrl + "/stats"
+    QuestsUrl: Final[str] = RacerUrl + "/quests"
+    LeaderboardsUrl: Final[str] = KlaviaUrl + "/leaderboards"
+    TextsUrl: Final[str] = LeaderboardsUrl + "/texts"
+    CarsUrl: Final[str] = LeaderboardsUrl + "/cars"
+    SearchRacerUrl: Final[str] = RacerUrl.format(user_id="autocomplete_with_garage") + "?query={search}"
+    TeamsUrl: Final[str] = KlaviaUrl + "/teams/{team_tag}"
+    ShopsUrl: Final[str] = KlaviaUrl + "/shops"
+    ShopSeasonUrl: Final[str] = ShopsUrl + "/season-shop"
+    ShopDealsUrl: Final[str] = ShopsUrl + "/alices-deals"
+    ShopItemsUrl: Final[str] = KlaviaUrl + "/shop_items/{item_id}"
+    CarSkinsUrl: Final[str] = KlaviaUrl + "/garage/cars/{car_id}/view-car-skins"
@@ -2,10 +2,13 @@ from typing import Any
 
 from discord import Member, Intents, Embed, Bot, Role, Guild
 from discord.abc import GuildChannel
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord.ext.commands import Context, CommandError
 from discord.utils import get
 
+from dscrd_bot.autocomplete import klavia_name_option
+from dscrd_bot.background_tasks.cycle_snapshot import CycleSnapshot
+from dscrd_bot.background_tasks.scheduler import Scheduler, ScheduledTask, seconds_until_daily
 from dscrd_bot.background_tasks.task_notify_shop_update import task_notify_shop_update
 from dscrd_bot.background_tasks.task_notify_team_events import task_notify_team_events
 from dscrd_bot.background_tasks.task_persist_shop_state import task_persist_shop_state
@@ -25,6 +28,8 @@ from dscrd_bot.embeds import DefaultEmbed
 from dscrd_bot.roles import HeBotRole
 from dscrd_bot.persistent_data import Persistence, Server
 from dscrd_bot.util import is_verified, error_handler, EnvVars, BotName
+from dscrd_bot.verification_watcher import VerificationWatcher
+from klavia.metrics import Metrics
 
 
 def main() -> None:
@@ -45,55 +50,77 @@ def main() -> None:
     else:
         bot: Bot = Bot(intents=intents)
 
+    async def sync_users() -> None:
+        print("Sync users . . .")
+        with Metrics.time("klaval_task_seconds", task="task_sync_users"):
+            await task_sync_users(bot)
+
     # noinspection PyBroadException
-    @tasks.loop(hours=.5)
-    async def scheduled_trigger() -> Any:
+    async def process_team_events() -> bool:
+        snapshot: CycleSnapshot = CycleSnapshot()  # Notify and persist share the same team pages.
         try:
-            print("Start scheduled trigger.")
-
-            try:
-                print("Sync users . . .")
-                await task_sync_users(bot)
-            except Exception as ex:
-                pass  # keep it running...
-                print("Error during user synchronization: ", ex)
-
-            try:
-                print("Process team events . . .")
-                await task_notify_team_events(bot)
-            except Exception as ex:
-                pass  # keep it running...
-                print("Error during team event processing: ", ex)
-
-            try:
-                print("Persist team state . . .")
-                await task_persist_team_state()
-            except Exception as ex:
-                pass  # keep it running...
-                print("Error during persistence update: ", ex)
-
-            try:
-                print("Send shop updates . . .")
-                await task_notify_shop_update(bot)
-            except Exception as ex:
-                pass  # keep it running...
-                print("Ecountered an error during shop notify: ", ex)
-            try:
-                print("Persist shop state . . .")
-                await task_persist_shop_state()
-            except Exception as ex:
-                pass  # keep it running...
-                print("Ecountered an error during shop persist: ", ex)
+            print("Process team events . . .")
+            with Metrics.time("klaval_task_seconds", task="task_notify_team_events"):
+                await task_notify_team_events(bot, snapshot)
+        except Exception as ex:
+            pass  # keep it running...
+            print("Error during team event processing: ", ex)
+
+        try:
+            print("Persist team state . . .")
+            with Metrics.time("klaval_task_seconds", task="task_persist_team_state"):
+                await task_persist_team_state(snapshot)
+        except Exception as ex:
+            pass  # keep it running...
+            print("Error during persistence update: ", ex)
+        return snapshot.changed
 
+    # noinspection PyBroadException
+    async def process_shop_update() -> bool:
+        snapshot: CycleSnapshot = CycleSnapshot()  # Notify and persist share the same shop pages.
+        try:
+            print("Send shop updates . . .")
+            with Metrics.time("klaval_task_seconds", task="task_notify_shop_update"):
+                await task_notify_shop_update(bot, snapshot)
         except Exception as ex:
-            pass  # I don't know what might have happend, but rather broad exception than crashing.
-            print("Scheduled trigger failed: ", ex)
-        finally:
-            print("Scheduled trigger finished.")
+            pass  # keep it running...
+            print("Ecountered an error during shop notify: ", ex)
+        try:
+            print("Persist shop state . . .")
+            with Metrics.time("klaval_task_seconds", task="task_persist_shop_state"):
+                await task_persist_shop_state(snapshot)
+        except Exception as ex:
+            pass  # keep it running...
+            print("Ecountered an error during shop persist: ", ex)
+        return snapshot.changed
+
+    scheduler: Scheduler = Scheduler()
+    scheduler.register(ScheduledTask("sync_users", sync_users, interval=60 * 60, timeout=60 * 45))
+    # Team and shop pages are polled more often after a change and less often while nothing happens:
+    scheduler.register(ScheduledTask(
+        "team_events", process_team_events, interval=60 * 30, max_interval=60 * 60 * 2, timeout=60 * 20
+    ))
+    shop_rotation_times: list[tuple[int, int]] = [
+        (int(hour), int(minute))
+        for hour, minute in (t.split(":") for t in (EnvVars.get("shop_rotation_times") or "00:00").split(","))
+    ]
+    scheduler.register(ScheduledTask(
+        "shop_update", process_shop_update, interval=60 * 2, max_interval=60 * 30, timeout=60 * 4,
+        next_event=lambda: seconds_until_daily(shop_rotation_times)
+    ))
 
     @bot.event
     async def on_ready() -> Any:
-        scheduled_trigger.start()
+        Persistence.start_write_behind(
+            float(EnvVars.get("persistence_flush_interval") or Persistence.DefaultFlushInterval)
+        )
+        Metrics.start_loop_lag_monitor()
+        if EnvVars.get("metrics_port"):
+            await Metrics.start_http_exporter(EnvVars.get("metrics_host") or "127.0.0.1", int(EnvVars["metrics_port"]))
+        if EnvVars.get("metrics_log_interval"):
+            Metrics.start_logging(float(EnvVars["metrics_log_interval"]))
+        VerificationWatcher.start(bot)  # Resumes verifications that were pending before a restart.
+        scheduler.start()
 
     @bot.event
     async def on_guild_join(guild: Guild) -> Any:
@@ -137,7 +164,7 @@ def main() -> None:
         server: Server = Persistence.get_server(str(member.guild.id))
         if is_verified(member):
             # Remove member from persistence:
-            server.verified_users = [u for u in server.verified_users if u.id != str(member.id)]
+            Persistence.remove_verified_user(server.id, str(member.id))
             Persistence.write()
         if server.welcome_channel is not None:
             await bot.get_channel(int(server.welcome_channel.id)).send(
@@ -154,7 +181,8 @@ def main() -> None:
     @commands.has_permissions(administrator=True)
     @bot.slash_command(description="Force a user verification. Can only be used by admins.")
     async def force_verify(ctx: Context, user: Member, klavia_id: str) -> Any:
-        await command_force_verify(ctx, user, klavia_id)
+        with Metrics.time("klaval_command_seconds", command="force_verify"):
+            await command_force_verify(ctx, user, klavia_id)
 
     @force_verify.error
     async def force_verify_error(ctx: Context, error: CommandError) -> Any:
@@ -163,36 +191,43 @@ def main() -> None:
     @commands.has_permissions(administrator=True)
     @bot.slash_command(description="Admins can use this to configure Klavals behavior.")
     async def setup(ctx: Context) -> Any:
-        await command_setup(ctx)
+        with Metrics.time("klaval_command_seconds", command="setup"):
+            await command_setup(ctx)
 
     @setup.error
     async def setup_error(ctx: Context, error: CommandError) -> Any:
         await error_handler(ctx, error)
 
     @bot.slash_command(description="Show a users current quests.")
-    async def quests(ctx: Context, klavia_name: str = "") -> Any:
-        await command_quests(ctx, klavia_name)
+    async def quests(ctx: Context, klavia_name: klavia_name_option(required=False) = "") -> Any:
+        with Metrics.time("klaval_command_seconds", command="quests"):
+            await command_quests(ctx, klavia_name)
 
     @bot.slash_command(description="Show a users stats.")
-    async def stats(ctx: Context, klavia_name: str = "") -> Any:
-        await command_stats(ctx, klavia_name)
+    async def stats(ctx: Context, klavia_name: klavia_name_option(required=False) = "") -> Any:
+        with Metrics.time("klaval_command_seconds", command="stats"):
+            await command_stats(ctx, klavia_name)
 
     @bot.slash_command(description="Show a users garage.")
-    async def garage(ctx: Context, klavia_name: str = "") -> Any:
-        await command_garage(ctx, klavia_name)
+    async def garage(ctx: Context, klavia_name: klavia_name_option(required=False) = "") -> Any:
+        with Metrics.time("klaval_command_seconds", command="garage"):
+            await command_garage(ctx, klavia_name)
 
     @bot.slash_command(description="Verify your account by linking it to your Klavia profile.")
-    async def verify(ctx: Context, klavia_name: str) -> Any:
-        await command_verify(ctx, klavia_name)
+    async def verify(ctx: Context, klavia_name: klavia_name_option()) -> Any:
+        with Metrics.time("klaval_command_seconds", command="verify"):
+            await command_verify(ctx, klavia_name)
 
     @bot.slash_command(description="Synchronize your Discord profile with your Klavia account.")
     async def sync(ctx: Context) -> Any:
-        await command_sync(ctx)
+        with Metrics.time("klaval_command_seconds", command="sync"):
+            await command_sync(ctx)
 
     @commands.has_permissions(administrator=True)
     @bot.slash_command(description="Force unverify a user.")
     async def force_unverify(ctx: Context, user: Member) -> Any:
-        await command_force_unverify(ctx, user)
+        with Metrics.time("klaval_command_seconds", command="force_unverify"):
+            await command_force_unverify(ctx, user)
 
     @force_unverify.error
     async def force_unverify_error(ctx: Context, error: CommandError) -> Any:
@@ -201,13 +236,16 @@ def main() -> None:
 
     @bot.slash_command(description="Unlink your Klavia account from your Discord profile.")
     async def unverify(ctx: Context) -> Any:
-        await command_unverify(ctx)
+        with Metrics.time("klaval_command_seconds", command="unverify"):
+            await command_unverify(ctx)
 
     @bot.slash_command(description="Finds all matching Klavia accounts.")
-    async def find_racer(ctx: Context, klavia_name: str) -> Any:
-        await command_find_racer(ctx, klavia_name)
+    async def find_racer(ctx: Context, klavia_name: klavia_name_option()) -> Any:
+        with Metrics.time("klaval_command_seconds", command="find_racer"):
+            await command_find_racer(ctx, klavia_name)
 
     bot.run(EnvVars["discord_bot_token"])
+    Persistence.flush_now()  # Write everything that the write-behind flusher has not written yet.
 
 
 if __name__ == '__main__':
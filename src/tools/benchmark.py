@@ -0,0 +1,195 @@
+from argparse import ArgumentParser, Namespace
+from asyncio import gather, run
+from dataclasses import dataclass, asdict
+from json import dumps, loads
+from pathlib import Path
+from platform import python_version
+from statistics import mean, quantiles
+from subprocess import run as run_process
+from time import perf_counter
+from tracemalloc import get_traced_memory, reset_peak, start as start_tracing, stop as stop_tracing
+from typing import Any, Awaitable, Callable
+
+from crawler import AsyncCrawler
+from klavia.parsers import HtmlParser
+from tools.fixtures import FixtureDir, FixtureParsers, FixtureSession, fixture_url, load_fixtures, synthetic_pages
+
+
+# Offline benchmarks of every crawler method. Pages are replayed from recorded fixtures and large synthetic pages.
+# Usage (from within src): python -m tools.benchmark [--output results.json] [--compare baseline.json]
+
+
+@dataclass
+class BenchmarkResult:
+    scenario: str
+    method: str
+    fixture: str
+    size_kib: float
+    parse_ms: float  # Parser only, without the crawler around it.
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    throughput: float  # Calls per second with all iterations running concurrently.
+    peak_kib: float  # Peak memory allocated by a single call.
+
+
+@dataclass
+class Benchmark:
+    method: str
+    fixture: str
+    html: str
+    kind: str
+    call: Callable[[AsyncCrawler], Awaitable[Any]]
+
+
+def get_benchmarks(pages: dict[str, str]) -> list[Benchmark]:
+    # One benchmark per page. (name -> html, named like the fixtures)
+    benchmarks: list[Benchmark] = []
+    for name, html in pages.items():
+        kind, _, key = name.partition("_")
+        call: Callable[[AsyncCrawler], Awaitable[Any]]
+        match kind:
+            case "racer":
+                method, call = "get_stats", lambda c, k=key: c.get_stats(k, fresh=True)
+            case "garage":
+                method, call = "get_garage", lambda c, k=key: c.get_garage(k, fresh=True)
+            case "quests":
+                method, call = "get_quests", lambda c, k=key: c.get_quests(k, fresh=True)
+            case "team":
+                method, call = "get_team", lambda c, k=key: c.get_team(k, fresh=True)  # Bypasses change detection.
+            case "shop":
+                if any(b.method == "get_shop" for b in benchmarks):
+                    continue  # Both shop sections are fetched by the same call.
+                method, call = "get_shop", lambda c: c.get_shop(fresh=True)
+            case "cars":
+                method, call = "get_cars_dict", lambda c: c.car_catalogue.refresh()  # Bypasses the catalogue's TTL.
+            case _:
+                continue
+        benchmarks.append(Benchmark(method=method, fixture=name, html=html, kind=kind, call=call))
+    return benchmarks
+
+
+async def measure(scenario: str, benchmark: Benchmark, crawler: AsyncCrawler, iterations: int) -> BenchmarkResult:
+    await benchmark.call(crawler)  # Warm up. (Car catalogue, parser threads, ...)
+
+    start: float = perf_counter()
+    for _ in range(iterations):
+        FixtureParsers[benchmark.kind](benchmark.html)
+    parse_ms: float = (perf_counter() - start) * 1000 / iterations
+
+    latencies: list[float] = []
+    for _ in range(iterations):
+        start = perf_counter()
+        await benchmark.call(crawler)
+        latencies.append((perf_counter() - start) * 1000)
+
+    start = perf_counter()
+    await gather(*[benchmark.call(crawler) for _ in range(iterations)])
+    throughput: float = iterations / (perf_counter() - start)
+
+    start_tracing()
+    reset_peak()
+    before: int = get_traced_memory()[0]
+    await benchmark.call(crawler)
+    peak: int = get_traced_memory()[1] - before
+    stop_tracing()
+
+    percentiles: list[float] = quantiles(latencies, n=20, method="inclusive") if len(latencies) > 1 else latencies * 19
+    return BenchmarkResult(
+        scenario=scenario,
+        method=benchmark.method,
+        fixture=benchmark.fixture,
+        size_kib=round(len(benchmark.html.encode("utf-8")) / 1024, 1),
+        parse_ms=round(parse_ms, 3),
+        mean_ms=round(mean(latencies), 3),
+        p50_ms=round(percentiles[9], 3),
+        p95_ms=round(percentiles[18], 3),
+        throughput=round(throughput, 1),
+        peak_kib=round(peak / 1024, 1)
+    )
+
+
+async def run_benchmarks(scenario: str, pages: dict[str, str], iterations: int) -> list[BenchmarkResult]:
+    urls: dict[str, str] = {fixture_url(*name.split("_", 1)): html for name, html in pages.items()}
+    shop_sections: list[str] = [html for name, html in pages.items() if name.startswith("shop_")]
+    if shop_sections:
+        # A single recorded shop section is replayed for both sections.
+        urls.setdefault(fixture_url("shop", "season"), shop_sections[0])
+        urls.setdefault(fixture_url("shop", "deals"), shop_sections[0])
+    crawler: AsyncCrawler = AsyncCrawler(session=FixtureSession(urls))
+
+    results: list[BenchmarkResult] = []
+    for benchmark in get_benchmarks(pages):
+        try:
+            results.append(await measure(scenario, benchmark, crawler, iterations))
+        except Exception as ex:
+            print(f"Cannot benchmark {benchmark.method} with {benchmark.fixture}: {ex!r}")
+    return results
+
+
+def get_commit() -> str:
+    try:
+        return run_process(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return "unknown"
+
+
+def print_results(results: list[BenchmarkResult], baseline: dict[tuple[str, str, str], dict[str, float]]) -> None:
+    print(
+        f"{'scenario':<11}{'method':<14}{'fixture':<22}{'KiB':>8}{'parse ms':>10}{'mean ms':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'calls/s':>10}{'peak KiB':>10}"
+    )
+    for r in results:
+        line: str = (
+            f"{r.scenario:<11}{r.method:<14}{r.fixture:<22}{r.size_kib:>8}{r.parse_ms:>10}{r.mean_ms:>10}"
+            f"{r.p50_ms:>10}{r.p95_ms:>10}{r.throughput:>10}{r.peak_kib:>10}"
+        )
+        base: dict[str, float] | None = baseline.get((r.scenario, r.method, r.fixture))
+        if base is not None and base["mean_ms"] > 0:
+            line += f"  ({(r.mean_ms / base['mean_ms'] - 1) * 100:+.1f} % mean vs. baseline)"
+        print(line)
+
+
+def main() -> None:
+    parser: ArgumentParser = ArgumentParser(description="Benchmark all crawler methods against recorded pages.")
+    parser.add_argument("--fixtures", type=Path, default=FixtureDir)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--backend", default=None, help="HTML parser backend. Default: html.parser")
+    parser.add_argument("--partial", action="store_true", help="Only parse the parts of a page that are needed.")
+    parser.add_argument("--team-size", type=int, default=500)
+    parser.add_argument("--car-count", type=int, default=1000)
+    parser.add_argument("--output", type=Path, help="Write results as JSON, to compare them with later runs.")
+    parser.add_argument("--compare", type=Path, help="JSON results of an earlier run.")
+    args: Namespace = parser.parse_args()
+
+    HtmlParser.use(args.backend, args.partial)
+    recorded: dict[str, str] = {path.stem: html for _, path, html in load_fixtures(args.fixtures)}
+    if not recorded:
+        print(f"No recorded fixtures in {args.fixtures}. Only synthetic pages are used.")
+
+    results: list[BenchmarkResult] = []
+    for scenario, pages in (("recorded", recorded), ("synthetic", synthetic_pages(args.team_size, args.car_count))):
+        if pages:
+            print(f"Run {scenario} pages . . .")
+            results += run(run_benchmarks(scenario, pages, args.iterations))
+
+    baseline: dict[tuple[str, str, str], dict[str, float]] = {}
+    if args.compare:
+        baseline = {(r["scenario"], r["method"], r["fixture"]): r for r in loads(args.compare.read_text())["results"]}
+    partial: str = " (partial)" if HtmlParser.is_partial() else ""
+    print(f"Commit {get_commit()}, Python {python_version()}, parser {HtmlParser.get()}{partial}")
+    print_results(results, baseline)
+
+    if args.output:
+        args.output.write_text(dumps({
+            "commit": get_commit(),
+            "python": python_version(),
+            "parser": HtmlParser.get(),
+            "partial": HtmlParser.is_partial(),
+            "iterations": args.iterations,
+            "results": [asdict(r) for r in results]
+        }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+from asyncio import sleep
+from hashlib import sha256
+from json import dumps
+from random import uniform
+
+from aiohttp import web
+
+from klavia.rate_limit import TokenBucket
+from klavia.session import KlaviaSession, KlaviaResponse
+from klavia.urls import KlaviaUrls
+from tools.fixtures import synthetic_pages
+
+
+class FakeKlavia:
+    # Local stand-in for Klavia. Serves synthetic pages for every racer and team with a configurable latency.
+
+    def __init__(self, latency: float = .2, jitter: float = .05, car_count: int = 200, team_size: int = 50) -> None:
+        self.latency: float = latency
+        self.jitter: float = jitter
+        self.request_count: int = 0
+        self._pages: dict[str, str] = synthetic_pages(team_size=team_size, car_count=car_count)
+        self._runner: web.AppRunner | None = None
+        self.base_url: str = ""
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app: web.Application = web.Application()
+        app.router.add_get("/", self._sign_in_page)
+        app.router.add_post("/racers/sign_in", self._sign_in)
+        app.router.add_get("/racers/autocomplete_with_garage", self._autocomplete)
+        app.router.add_get("/racers/{racer_id}/garage", self._page("garage_synthetic"))
+        app.router.add_get("/racers/{racer_id}/quests", self._page("quests_synthetic"))
+        app.router.add_get("/racers/{racer_id}", self._page("racer_synthetic"))
+        app.router.add_get("/leaderboards/cars", self._page("cars_all"))
+        app.router.add_get("/teams/{team_tag}", self._page("team_SYN"))
+        app.router.add_get("/shops/season-shop", self._page("shop_season"))
+        app.router.add_get("/shops/alices-deals", self._page("shop_deals"))
+
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site: web.TCPSite = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.base_url = f"http://{host}:{self._runner.addresses[0][1]}"  # Port 0 -> a free port has been picked.
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _respond(self, text: str, content_type: str = "text/html") -> web.Response:
+        self.request_count += 1
+        await sleep(max(0.0, self.latency + uniform(-self.jitter, self.jitter)))
+        return web.Response(text=text, content_type=content_type)
+
+    def _page(self, name: str):
+        # Pages support conditional requests, like Klavia's: ETag -> If-None-Match -> 304 Not Modified
+        async def handler(request: web.Request) -> web.Response:
+            etag: str = f'W/"{sha256(self._pages[name].encode("utf-8")).hexdigest()[:32]}"'
+            if request.headers.get("If-None-Match") == etag:
+                self.request_count += 1
+                await sleep(max(0.0, self.latency + uniform(-self.jitter, self.jitter)))
+                return web.Response(status=304, headers={"ETag": etag})
+            response: web.Response = await self._respond(self._pages[name])
+            response.headers["ETag"] = etag
+            return response
+        return handler
+
+    async def _sign_in_page(self, _: web.Request) -> web.Response:
+        return await self._respond('<html><head><meta name="csrf-token" content="fake"></head></html>')
+
+    async def _sign_in(self, _: web.Request) -> web.Response:
+        # Like Klavia: A successful login redirects away from the sign in page.
+        raise web.HTTPFound("/")
+
+    async def _autocomplete(self, request: web.Request) -> web.Response:
+        # Every query matches a racer with the same name (or id) and a few similar ones: [id, display name, username]
+        query: str = request.query.get("query", "")
+        racers: list[list] = [[1000 + i, f"{query} {i}".strip(), f"{query}{i}"] for i in range(1, 5)]
+        if query.isdigit():
+            racers.insert(0, [int(query), f"Racer {query}", f"racer{query}"])
+        else:
+            racers.insert(0, [abs(hash(query)) % 100000, query.title(), query])
+        return await self._respond(dumps(racers), "application/json")
+
+
+class LocalKlaviaSession(KlaviaSession):
+    # Sends all requests to base_url instead of Klavia.
+
+    def __init__(
+            self,
+            base_url: str,
+            connection_limit: int = KlaviaSession.ConnectionLimit,
+            rate_limit: TokenBucket | None = None
+    ) -> None:
+        super().__init__("load-test", "load-test", connection_limit, rate_limit)
+        self._base_url: str = base_url
+
+    async def _request(
+            self,
+            method: str,
+            url: str,
+            data: dict[str, str] | None = None,
+            headers: dict[str, str] | None = None
+    ) -> KlaviaResponse:
+        return await super()._request(method, url.replace(KlaviaUrls.KlaviaUrl, self._base_url, 1), data, headers)
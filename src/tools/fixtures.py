@@ -0,0 +1,133 @@
+from asyncio import sleep
+from json import dumps
+from pathlib import Path
+from typing import Any, Callable, Final
+from urllib.parse import parse_qs, urlsplit
+
+from klavia.parsers import (
+    parse_display_name, parse_shop_section, parse_team, parse_quests, parse_stats, parse_garage, parse_cars
+)
+from klavia.session import KlaviaSession, KlaviaResponse
+from klavia.urls import KlaviaUrls
+
+
+RootDir: Final[Path] = Path(__file__).parent.parent.parent.resolve()
+FixtureDir: Final[Path] = RootDir / "fixtures"
+
+
+# Recorded pages are named <kind>_<anything>.html. The kind decides which parsers are run on the page.
+FixtureParsers: Final[dict[str, Callable[[str], Any]]] = {
+    "racer": lambda html: (parse_display_name(html), parse_stats(html, "0")),
+    "garage": parse_garage,
+    "quests": lambda html: parse_quests(html, "0"),
+    "team": parse_team,
+    "shop": parse_shop_section,
+    "cars": parse_cars,
+}
+
+
+def load_fixtures(fixture_dir: Path = FixtureDir) -> list[tuple[str, Path, str]]:
+    # Returns (kind, path, html) of every recorded page with a known kind.
+    fixtures: list[tuple[str, Path, str]] = []
+    for path in sorted(fixture_dir.glob("*.html")):
+        kind: str = path.stem.split("_")[0]
+        if kind in FixtureParsers:
+            fixtures.append((kind, path, path.read_text(encoding="utf-8")))
+    return fixtures
+
+
+def fixture_url(kind: str, key: str) -> str:
+    # Klavia url that a recorded page of this kind has been fetched from. key is the part after the kind.
+    return {
+        "racer": lambda: KlaviaUrls.RacerUrl.format(user_id=key),
+        "garage": lambda: KlaviaUrls.GarageUrl.format(user_id=key),
+        "quests": lambda: KlaviaUrls.QuestsUrl.format(user_id=key),
+        "team": lambda: KlaviaUrls.TeamsUrl.format(team_tag=key.upper()),
+        "shop": lambda: KlaviaUrls.ShopSeasonUrl if key == "season" else KlaviaUrls.ShopDealsUrl,
+        "cars": lambda: KlaviaUrls.CarsUrl,
+    }[kind]()
+
+
+def synthetic_pages(team_size: int = 500, car_count: int = 1000, offer_count: int = 50) -> dict[str, str]:
+    # Large pages in the same shape as Klavia's. Used to measure how parsing scales.
+    cars: str = "".join(
+        f'<tr><td>{i + 1}</td><td><img title="Car {i}" src="https://klavia.io/cars/{i}.png"></td><td>{i}</td></tr>'
+        for i in range(car_count)
+    )
+    garage_cars: str = "".join(
+        f'<a data-turbo-frame="selected_car" title="Car {i} | {i} races" href="/garage/cars/{i}">Car {i}</a>'
+        for i in range(0, car_count, 10)
+    )
+    team_rows: str = "".join(
+        f'<tr><td><a href="/racers/{i}">Racer {i}</a>'
+        + ('<div class="badge" title="Leader">L</div>' if i == 0 else "")
+        + ('<div class="badge" title="Agent">A</div>' if 0 < i <= 5 else "")
+        + f'</td><td>Squad</td><td>2025-01-01</td><td>1 hour ago</td><td>{i}</td></tr>'
+        for i in range(team_size)
+    )
+    offers: str = "".join(
+        f'<div class="col-lg-6"><div class="mb-3"><img src="/shop/{i}.png"></div>'
+        f'<h4>Offer {i}\nCar</h4><strong>{i},000</strong></div>'
+        for i in range(offer_count)
+    )
+    quests: str = "".join(
+        f'<a data-turbo-frame="modal">Quest {i}</a>'
+        f'<div data-controller="progress" data-progress-percentage-value="{i * 10}"></div>'
+        for i in range(10)
+    )
+    return {
+        "cars_all": f"<html><body><table><tr><th>#</th><th>Car</th><th>Races</th></tr>{cars}</table></body></html>",
+        "garage_synthetic": (
+            f"<html><body><h3>Synthetic Racer</h3>{garage_cars}"
+            '<div id="selected_car"><div class="card-header">Car 0 <span>Selected</span></div></div>'
+            "<table><tbody><tr>"
+            + "".join(f'<td class="text-end">{v}</td>' for v in ("10", "1", "80.5", "97.1%", "120.2", "100.0%", "3"))
+            + "</tr></tbody></table></body></html>"
+        ),
+        "racer_synthetic": (
+            "<html><body><h3>Synthetic Racer</h3>"
+            "<strong>1,234 races</strong><strong>150.5 WPM</strong><strong>42</strong><table>"
+            + "".join(f"<tr><td>Stat {i}</td><td>{i}</td></tr>" for i in range(50))
+            + "<tr><td>Longest Session</td><td>1,000 races</td></tr>"
+            "<tr><td>Current Speed</td><td>99.5 WPM</td></tr>"
+            "<tr><td>Current Accuracy</td><td>97.5%</td></tr></table></body></html>"
+        ),
+        "quests_synthetic": f"<html><body><h3>Synthetic Racer</h3><h5>Quest 0</h5>{quests}</body></html>",
+        "team_SYN": (
+            '<html><body><h1>Synthetic Team</h1><table id="tbl-daily-tracker">'
+            f"<thead><tr><th>Racer</th></tr></thead><tbody>{team_rows}</tbody></table></body></html>"
+        ),
+        "shop_season": f'<html><body><div class="row g-3">{offers}</div></body></html>',
+        "shop_deals": f'<html><body><div class="row g-3">{offers}</div></body></html>',
+    }
+
+
+class FixtureSession(KlaviaSession):
+    # Transport adapter: Answers every request from the given pages (url -> html) instead of Klavia. Never logs in.
+    # Racer searches for ids that have no page are answered with a racer named after the id. (e.g. team members)
+
+    def __init__(self, pages: dict[str, str], latency: float = 0) -> None:
+        super().__init__("", "")
+        self._pages: dict[str, str] = pages
+        self._latency: float = latency
+        self._bytes_received: int = 0
+
+    @property
+    def bytes_received(self) -> int:
+        return self._bytes_received
+
+    async def get(self, url: str, headers: dict[str, str] | None = None) -> KlaviaResponse:
+        self._request_count += 1
+        if self._latency > 0:
+            await sleep(self._latency)
+        text: str | None = self._pages.get(url)
+        if text is None and url.startswith(KlaviaUrls.SearchRacerUrl.format(search="")):
+            query: str = parse_qs(urlsplit(url).query).get("query", [""])[0]
+            text = dumps([[int(query), f"Racer {query}", f"racer{query}"]] if query.isdigit() else [])
+        if text is None:
+            return KlaviaResponse(url=url, status=404, text="")
+        self._bytes_received += len(text.encode("utf-8"))
+        return KlaviaResponse(url=url, status=200, text=text)
+
+    async def close(self) -> None:
+        pass
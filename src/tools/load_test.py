@@ -0,0 +1,234 @@
+from argparse import ArgumentParser, Namespace
+from asyncio import Event, Semaphore, Task, create_task, gather, get_running_loop, run, sleep
+from dataclasses import dataclass, field
+from pathlib import Path
+from random import choice
+from statistics import mean, quantiles
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Final
+
+from crawler import AsyncCrawler
+from dscrd_bot.commands.find_racer import command_find_racer
+from dscrd_bot.commands.garage import command_garage
+from dscrd_bot.commands.stats import command_stats
+from dscrd_bot.persistent_data import Persistence
+from dscrd_bot.roles import HeBotRole
+from dscrd_bot.util import SharedCrawler
+from klavia.metrics import Metrics
+from klavia.rate_limit import TokenBucket
+from klavia.transport import RequestPriority, SharedTransport, request_priority
+from tools.fake_klavia import FakeKlavia, LocalKlaviaSession
+
+
+# Drives slash commands through stubbed Discord objects against a local fake Klavia server.
+# Usage (from within src): python -m tools.load_test --invocations 500 --concurrency 50 --klavia-latency .3
+
+
+AcknowledgeWindow: Final[float] = 3  # Discord drops interactions that have not been deferred within 3 seconds.
+FollowUpWindow: Final[float] = 60 * 15  # Deferred interactions must be answered within 15 minutes.
+
+Commands: Final[dict[str, Callable[[Any, str], Awaitable[None]]]] = {
+    "garage": command_garage,
+    "stats": command_stats,
+    "find_racer": command_find_racer,
+}
+
+
+@dataclass
+class FakeRole:
+    name: str
+    id: int = 0
+
+    @property
+    def mention(self) -> str:
+        return f"<@&{self.id}>"
+
+
+@dataclass
+class FakeGuild:
+    id: int
+    roles: list[FakeRole] = field(default_factory=lambda: [FakeRole(name=str(role)) for role in HeBotRole])
+
+
+@dataclass
+class FakeMember:
+    id: int
+    guild: FakeGuild
+    roles: list[FakeRole]
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+
+@dataclass
+class FakeCommand:
+    name: str
+
+
+class FakeResponse:
+    def __init__(self, invocation: "Invocation") -> None:
+        self._invocation: Invocation = invocation
+
+    async def defer(self, ephemeral: bool = False) -> None:
+        self._invocation.deferred_at = perf_counter()
+
+
+class Invocation:
+    # Stub of the slash command context. Records when the command has been deferred and answered.
+
+    def __init__(self, command: str, guild: FakeGuild, author_id: int) -> None:
+        self.command: FakeCommand = FakeCommand(command)
+        self.guild: FakeGuild = guild
+        verified: list[FakeRole] = [r for r in guild.roles if r.name == str(HeBotRole.Verified)]
+        self.author: FakeMember = FakeMember(id=author_id, guild=guild, roles=verified)
+        self.response: FakeResponse = FakeResponse(self)
+        self.started_at: float = 0
+        self.deferred_at: float | None = None
+        self.responded_at: float | None = None
+        self.error: Exception | None = None
+
+    async def respond(self, *args, **kwargs) -> None:
+        if self.responded_at is None:
+            self.responded_at = perf_counter()
+
+
+class LoopLagMonitor:
+    # Measures how late the event loop wakes up a task that sleeps for a fixed interval.
+    Interval: Final[float] = .01
+
+    def __init__(self) -> None:
+        self.lags: list[float] = []
+        self._stopped: Event = Event()
+
+    async def run(self) -> None:
+        loop = get_running_loop()
+        while not self._stopped.is_set():
+            start: float = loop.time()
+            await sleep(LoopLagMonitor.Interval)
+            self.lags.append(max(0.0, loop.time() - start - LoopLagMonitor.Interval))
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+def percentiles(values: list[float]) -> tuple[float, float, float]:
+    if not values:
+        return 0, 0, 0
+    if len(values) == 1:
+        return values[0], values[0], values[0]
+    q: list[float] = quantiles(values, n=100, method="inclusive")
+    return q[49], q[94], q[98]
+
+
+def report(invocations: list[Invocation], duration: float, lags: list[float], klavia_requests: int) -> None:
+    failed: list[Invocation] = [i for i in invocations if i.error is not None or i.responded_at is None]
+    done: list[Invocation] = [i for i in invocations if i not in failed]
+    print(f"Invocations: {len(invocations)}, failed: {len(failed)}, duration: {duration:.2f} s")
+    print(f"Throughput: {len(done) / duration:.1f} commands/s, Klavia requests: {klavia_requests}")
+
+    for command in Commands:
+        runs: list[Invocation] = [i for i in done if i.command.name == command]
+        if not runs:
+            continue
+        acks: list[float] = [(i.deferred_at - i.started_at) * 1000 for i in runs]
+        latencies: list[float] = [(i.responded_at - i.deferred_at) * 1000 for i in runs]
+        p50, p95, p99 = percentiles(latencies)
+        late_acks: int = sum(a > AcknowledgeWindow * 1000 for a in acks)
+        late_responses: int = sum(lat > FollowUpWindow * 1000 for lat in latencies)
+        print(
+            f"  /{command:<11} n={len(runs):<5} defer->respond p50 {p50:8.1f} ms  p95 {p95:8.1f} ms  "
+            f"p99 {p99:8.1f} ms  max ack {max(acks):7.1f} ms  "
+            f"late acks {late_acks}  late responses {late_responses}"
+        )
+
+    lag_ms: list[float] = [lag * 1000 for lag in lags]
+    p50, p95, p99 = percentiles(lag_ms)
+    print(
+        f"Event loop lag: mean {mean(lag_ms) if lag_ms else 0:.2f} ms  p50 {p50:.2f} ms  p95 {p95:.2f} ms  "
+        f"p99 {p99:.2f} ms  max {max(lag_ms, default=0):.2f} ms"
+    )
+    for invocation in failed[:5]:
+        print(f"  failed /{invocation.command.name}: {invocation.error!r}")
+
+
+async def load_test(args: Namespace) -> None:
+    klavia: FakeKlavia = FakeKlavia(latency=args.klavia_latency, jitter=args.klavia_jitter)
+    base_url: str = await klavia.start()
+    crawler: AsyncCrawler = AsyncCrawler(
+        session=LocalKlaviaSession(base_url, rate_limit=TokenBucket(args.requests_per_second))
+    )
+    SharedCrawler.use(crawler)
+
+    guild: FakeGuild = FakeGuild(id=1)
+    names: list[str] = [f"racer{i}" for i in range(args.racers)]
+    semaphore: Semaphore = Semaphore(args.concurrency)
+
+    async def invoke(n: int) -> Invocation:
+        command: str = choice(args.commands)
+        invocation: Invocation = Invocation(command, guild, author_id=n)
+        async with semaphore:
+            invocation.started_at = perf_counter()
+            try:
+                await Commands[command](invocation, choice(names))
+            except Exception as ex:
+                invocation.error = ex
+        return invocation
+
+    async def scrape(n: int) -> None:
+        # Background load, like the user sync: Fresh garage pages that compete with the commands for Klavia.
+        with request_priority(RequestPriority.Background):
+            await crawler.get_garage(f"background{n}", fresh=True)
+
+    monitor: LoopLagMonitor = LoopLagMonitor()
+    monitor_task = create_task(monitor.run())
+    background: list[Task] = [create_task(scrape(n)) for n in range(args.background_requests)]
+    start: float = perf_counter()
+    try:
+        invocations: list[Invocation] = await gather(*[invoke(n) for n in range(args.invocations)])
+    finally:
+        duration: float = perf_counter() - start
+        monitor.stop()
+        await monitor_task
+        for task in background:
+            task.cancel()
+        await gather(*background, return_exceptions=True)
+        await crawler.close()
+        await klavia.stop()
+    report(invocations, duration, monitor.lags, klavia.request_count)
+    for labels, wait in Metrics.summary().get("klavia_request_queue_wait_seconds", {}).items():
+        print(
+            f"Klavia request queue wait ({labels}): "
+            f"mean {wait['mean'] * 1000:.1f} ms  max {wait['max'] * 1000:.1f} ms"
+        )
+
+
+def main() -> None:
+    parser: ArgumentParser = ArgumentParser(description="Load test slash commands against a fake Klavia server.")
+    parser.add_argument("--invocations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50, help="Commands in flight at the same time.")
+    parser.add_argument("--commands", nargs="+", choices=list(Commands), default=list(Commands))
+    parser.add_argument("--racers", type=int, default=50, help="Distinct racer names the commands ask for.")
+    parser.add_argument("--klavia-latency", type=float, default=.2, help="Seconds per fake Klavia response.")
+    parser.add_argument("--klavia-jitter", type=float, default=.05)
+    parser.add_argument(
+        "--background-requests", type=int, default=0,
+        help="Background page fetches that are queued behind the commands' Klavia requests."
+    )
+    parser.add_argument(
+        "--requests-per-second", type=float, default=SharedTransport.RequestsPerSecond,
+        help="Request budget of the crawler. (Use a large value to measure the bot without the rate limit)"
+    )
+    args: Namespace = parser.parse_args()
+
+    with TemporaryDirectory() as persistence_dir:
+        # Never touch the bot's real persistence:
+        Persistence.PersistenceFile = Path(persistence_dir) / "persistence.sqlite3"
+        Persistence.LegacyPersistenceFile = Path(persistence_dir) / "persistence.json"
+        run(load_test(args))
+        Persistence.flush_now()
+
+
+if __name__ == '__main__':
+    main()
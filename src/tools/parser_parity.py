@@ -0,0 +1,92 @@
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+from typing import Any
+
+from klavia.parsers import HtmlParser, TeamPage, parse_display_name, parse_team
+from tools.fixtures import FixtureDir, FixtureParsers, load_fixtures
+
+
+# Proves that a parser backend returns exactly the same results as the reference parser (html.parser on whole pages).
+# Only recorded Klavia pages count as proof, so every kind of page must have been recorded.
+# Also checks that the team table shows display names: Each team row must match the header of the racer's profile.
+# Usage (from within src): python -m tools.parser_parity [--backend lxml] [--fixtures <dir>]
+# The candidate always parses partially, because that is what html_parser_partial=true enables.
+
+
+def parse(kind: str, html: str, backend: str | None, partial: bool) -> Any:
+    HtmlParser.use(backend, partial)
+    try:
+        return FixtureParsers[kind](html)
+    except Exception as ex:
+        return ex  # Raising the same kind of exception is parity, too.
+
+
+def same(reference: Any, candidate: Any) -> bool:
+    if isinstance(reference, Exception) or isinstance(candidate, Exception):
+        return type(reference) is type(candidate)
+    return reference == candidate
+
+
+def check_team_display_names(fixtures: list[tuple[str, Path, str]]) -> tuple[int, int]:
+    # Returns (checked, mismatches). Only rows of racers whose profile has been recorded can be checked.
+    HtmlParser.use(HtmlParser.ReferenceBackend, partial=False)
+    profiles: dict[str, str] = {path.stem.split("_", 1)[1]: html for kind, path, html in fixtures if kind == "racer"}
+    checked: int = 0
+    mismatches: int = 0
+    for kind, path, html in fixtures:
+        if kind != "team":
+            continue
+        team: TeamPage = parse_team(html)
+        for row in team.rows:
+            if row.racer_id not in profiles:
+                continue
+            checked += 1
+            display_name: str = parse_display_name(profiles[row.racer_id])
+            if row.display_name != display_name:
+                mismatches += 1
+                print(f"MISMATCH  {path.name}: racer {row.racer_id} is '{row.display_name}', profile: '{display_name}'")
+    return checked, mismatches
+
+
+def main() -> None:
+    parser: ArgumentParser = ArgumentParser(description="Compare parser backends against the reference parser.")
+    parser.add_argument("--backend", default=None, help="Backend to check. Default: fastest available.")
+    parser.add_argument("--fixtures", type=Path, default=FixtureDir)
+    parser.add_argument(
+        "--allow-missing", action="store_true", help="Only check the recorded kinds, instead of failing without all."
+    )
+    args: Namespace = parser.parse_args()
+
+    backend: str = args.backend or HtmlParser.fastest()
+    HtmlParser.use(backend)
+    fixtures: list[tuple[str, Path, str]] = load_fixtures(args.fixtures)
+    missing: list[str] = sorted(set(FixtureParsers) - {kind for kind, _, _ in fixtures})
+    if missing and not (args.allow_missing and fixtures):
+        raise SystemExit(
+            f"No recorded {', '.join(missing)} pages in {args.fixtures}. "
+            f"Record them with tools.record_fixtures first. (See {args.fixtures / 'README.md'})"
+        )
+
+    mismatches: int = 0
+    for kind, path, html in fixtures:
+        reference: Any = parse(kind, html, HtmlParser.ReferenceBackend, partial=False)
+        candidate: Any = parse(kind, html, backend, partial=True)
+        if same(reference, candidate):
+            print(f"OK        {path.name}")
+        else:
+            mismatches += 1
+            print(f"MISMATCH  {path.name}\n  reference: {reference!r}\n  {backend}: {candidate!r}")
+
+    print(f"{len(fixtures) - mismatches}/{len(fixtures)} fixtures identical with backend '{backend}'.")
+
+    checked, name_mismatches = check_team_display_names(fixtures)
+    print(f"{checked - name_mismatches}/{checked} team rows show the display name of the racer's profile.")
+    if checked == 0 and not args.allow_missing:
+        print("No team row could be checked. Record the profiles of team members with tools.record_fixtures.")
+        raise SystemExit(1)
+    if mismatches or name_mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
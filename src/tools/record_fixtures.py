@@ -0,0 +1,68 @@
+from argparse import ArgumentParser, Namespace
+from asyncio import run
+from pathlib import Path
+
+from dotenv import dotenv_values
+
+from klavia.parsers import TeamPage, parse_team
+from klavia.session import KlaviaSession
+from klavia.urls import KlaviaUrls
+from tools.fixtures import FixtureDir, RootDir
+
+
+# Records Klavia pages as fixtures for the parser parity check and the benchmarks.
+# Usage (from within src): python -m tools.record_fixtures --racer 62812 --team VYN
+# Records every kind of page that the parity check requires: racer, garage, quests, team, shop and cars.
+# Also records the profiles of a few members of every team, so that the display names in the team table can be
+# checked against the profile headers.
+
+
+async def record(args: Namespace) -> None:
+    env: dict[str, str] = dotenv_values(RootDir / ".env")
+    session: KlaviaSession = KlaviaSession(env["klavia_username_or_mail"], env["klavia_password"])
+    pages: dict[str, str] = {"cars_all": KlaviaUrls.CarsUrl}
+    for racer_id in args.racer:
+        pages[f"racer_{racer_id}"] = KlaviaUrls.RacerUrl.format(user_id=racer_id)
+        pages[f"garage_{racer_id}"] = KlaviaUrls.GarageUrl.format(user_id=racer_id)
+        pages[f"quests_{racer_id}"] = KlaviaUrls.QuestsUrl.format(user_id=racer_id)
+    if not args.no_shop:
+        pages["shop_season"] = KlaviaUrls.ShopSeasonUrl
+        pages["shop_deals"] = KlaviaUrls.ShopDealsUrl
+
+    args.out.mkdir(parents=True, exist_ok=True)
+
+    async def save(name: str, url: str) -> str:
+        html: str = (await session.get(url)).text
+        (args.out / f"{name}.html").write_text(html, encoding="utf-8")
+        print(f"Recorded {url} -> {name}.html")
+        return html
+
+    try:
+        for tag in args.team:
+            tag = tag.upper()
+            team: TeamPage = parse_team(await save(f"team_{tag}", KlaviaUrls.TeamsUrl.format(team_tag=tag)))
+            for row in team.rows[:args.team_members]:
+                pages.setdefault(f"racer_{row.racer_id}", KlaviaUrls.RacerUrl.format(user_id=row.racer_id))
+        for name, url in pages.items():
+            await save(name, url)
+    finally:
+        await session.close()
+
+
+def main() -> None:
+    parser: ArgumentParser = ArgumentParser(description="Record Klavia pages as parser fixtures.")
+    parser.add_argument("--racer", action="append", default=[], help="Racer id. May be given multiple times.")
+    parser.add_argument("--team", action="append", default=[], help="Team tag. May be given multiple times.")
+    parser.add_argument("--no-shop", action="store_true", help="Do not record the shop sections.")
+    parser.add_argument(
+        "--team-members", type=int, default=3, help="Number of profiles to record per team. Default: 3"
+    )
+    parser.add_argument("--out", type=Path, default=FixtureDir)
+    args: Namespace = parser.parse_args()
+    if not args.racer or not args.team:
+        parser.error("The parity check needs at least one --racer and one --team.")
+    run(record(args))
+
+
+if __name__ == '__main__':
+    main()